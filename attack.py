@@ -1,10 +1,106 @@
 import random
 
+from item import HULATANG_HEAL
+from rng import RandomStreams, EVENTS, COMBAT, LOOT
+
+try:
+    import numpy as np
+except ImportError:  # 未安装 numpy 时批量抽样退回逐个抽样
+    np = None
+
+# 探索事件，顺序与 event_weights 返回的权重一一对应
+EVENT_HANDLERS = ('_find_gold', '_encounter_monster', '_find_equipment', '_get_blessing', '_get_cursed')
+EVENT_NAMES = ('找到井盖', '遭遇怪物', '发现装备', '获得祝福', '受到诅咒')
+
+
+def event_weights(distance):
+    """距离老家 distance 步时各探索事件的权重"""
+    # 根据距离调整事件概率（越远战斗概率越高）
+    weights = [0.3 - (distance * 0.02),
+               0.3 + (distance * 0.05),
+               0.15,
+               0.1,
+               0.15 + (distance * 0.02)]
+    # 确保概率不为负
+    return [max(0.05, w) for w in weights]
+
+
+class AliasTable:
+    """Vose 别名表：建表 O(n)，之后每次按权重抽样只需 O(1)"""
+
+    def __init__(self, weights):
+        self._arrays = None  # numpy 版本的 prob/alias，批量抽样时才生成
+        n = len(weights)
+        total = sum(weights)
+        scaled = [w * n / total for w in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # 剩下的列只因浮点误差略偏离 1，概率保持为 1
+
+    def sample(self, rng=random):
+        """抽取一个下标"""
+        u = rng.random() * len(self.prob)
+        column = int(u)
+        return column if u - column < self.prob[column] else self.alias[column]
+
+    def sample_many(self, count, generator):
+        """用 numpy 随机数生成器一次抽取 count 个下标"""
+        if self._arrays is None:
+            self._arrays = np.array(self.prob), np.array(self.alias)
+        prob, alias = self._arrays
+        columns = generator.integers(0, len(prob), size=count)
+        return np.where(generator.random(count) < prob[columns], columns, alias[columns])
+
 
 class ExplorationEvents:
-    def __init__(self, player, game_map):
+    def __init__(self, player, game_map, rng=None):
         self.player = player
         self.game_map = game_map
+        # 事件选择、战斗和掉落各用一条独立的随机数流
+        self.rng = rng if rng is not None else RandomStreams()
+        self.event_rng = self.rng.stream(EVENTS)
+        self.combat_rng = self.rng.stream(COMBAT)
+        self.loot_rng = self.rng.stream(LOOT)
+        self._event_tables = {}  # {距离: AliasTable}
+
+    def event_table(self, distance):
+        """距离 distance 的事件抽样表（按距离缓存）"""
+        table = self._event_tables.get(distance)
+        if table is None:
+            table = self._event_tables[distance] = AliasTable(self.event_weights(distance))
+        return table
+
+    def event_weights(self, distance):
+        return event_weights(distance)
+
+    def invalidate_event_tables(self):
+        """事件权重规则改变后调用，丢弃已缓存的抽样表"""
+        self._event_tables.clear()
+
+    def sample_events(self, distances, seed=None):
+        """为一批区域（按距离）一次抽取探索事件，返回 EVENT_NAMES 中的下标列表，不触发事件本身
+
+        安装 numpy 时相同距离的区域一起抽样。不指定 seed 时从 events 流抽取。
+        """
+        if np is None:
+            rng = random.Random(seed) if seed is not None else self.event_rng
+            return [self.event_table(distance).sample(rng) for distance in distances]
+
+        generator = np.random.default_rng(seed) if seed is not None else self.rng.numpy(EVENTS)
+        distances = np.asarray(distances, dtype=np.int64)
+        events = np.empty(len(distances), dtype=np.int64)
+        for distance in np.unique(distances):
+            mask = distances == distance
+            events[mask] = self.event_table(int(distance)).sample_many(int(mask.sum()), generator)
+        return events.tolist()
 
     def explore_area(self, area_id):
         """处理探索事件"""
@@ -17,24 +113,8 @@ class ExplorationEvents:
 
         self.game_map.mark_explored(area_id)
         distance = area['distance_from_home']
-        events = [
-            self._find_gold,
-            self._encounter_monster,
-            self._find_equipment,
-            self._get_blessing,
-            self._get_cursed
-        ]
-        # 根据距离调整事件概率（越远战斗概率越高）
-        weights = [0.3 - (distance * 0.02),
-                   0.3 + (distance * 0.05),
-                   0.15,
-                   0.1,
-                   0.15 + (distance * 0.02)]
-        # 确保概率不为负
-        weights = [max(0.05, w) for w in weights]
-
-        event = random.choices(events, weights=weights, k=1)[0]
-        return event(distance)
+        event = EVENT_HANDLERS[self.event_table(distance).sample(self.event_rng)]
+        return getattr(self, event)(distance)
 
     def _find_gold(self, distance):
         """发现井盖"""
@@ -88,7 +168,7 @@ class ExplorationEvents:
 
         # 玩家攻击
         damage = max(1, self.player.attack - monster['defense'])
-        if random.random() < self.player.critical_chance / 100:
+        if self.combat_rng.random() < self.player.critical_chance / 100:
             damage *= 2
             messages.append(f"你打出了暴击！对{monster['name']}造成{damage}点伤害")
         else:
@@ -98,21 +178,7 @@ class ExplorationEvents:
         if monster_hp <= 0:
             battle_over = True
             victory = True
-            self.player.add_xp(monster['xp'])
-            gold, _ = self.player.add_gold(monster['reward'])
-            if self.player.equipped_weapon == "沾了胡辣汤的油条":
-                self.player.heal_hp()
-                messages.append("沾了胡辣汤的油条特效：战斗胜利回满血量！")
-
-            # 50%几率掉落井盖
-            if random.random() < 0.5:
-                manhole_covers = random.randint(1, 5)
-                if '井盖' not in self.player.items:
-                    self.player.items['井盖'] = 0
-                self.player.items['井盖'] += manhole_covers
-                messages.append(f"意外地发现了{manhole_covers}个井盖！")
-
-            messages.append(f"战胜了{monster['name']}，获得{gold}个井盖和{monster['xp']}点经验！")
+            messages.extend(self._battle_rewards(monster))
         else:
             # 怪物攻击
             monster_damage = max(1, monster['attack'] - self.player.defense)
@@ -128,11 +194,77 @@ class ExplorationEvents:
 
         return {"messages": messages, "monster_hp": monster_hp, "battle_over": battle_over, "victory": victory}
 
+    def _battle_rewards(self, monster):
+        """战斗胜利：获得经验和井盖，返回奖励消息"""
+        messages = []
+        self.player.add_xp(monster['xp'])
+        gold, _ = self.player.add_gold(monster['reward'])
+        if self.player.equipped_weapon == "沾了胡辣汤的油条":
+            self.player.heal_hp()
+            messages.append("沾了胡辣汤的油条特效：战斗胜利回满血量！")
+
+        # 50%几率掉落井盖
+        if self.loot_rng.random() < 0.5:
+            manhole_covers = self.loot_rng.randint(1, 5)
+            if '井盖' not in self.player.items:
+                self.player.items['井盖'] = 0
+            self.player.items['井盖'] += manhole_covers
+            messages.append(f"意外地发现了{manhole_covers}个井盖！")
+
+        messages.append(f"战胜了{monster['name']}，获得{gold}个井盖和{monster['xp']}点经验！")
+        return messages
+
+    def auto_battle(self, monster, heal_below=None):
+        """自动打完一整场战斗，不生成逐回合消息，返回战斗摘要
+
+        heal_below 为 0~1 之间的比例：回合开始时生命值低于最大生命值的这个比例且背包里有胡辣汤时，
+        本回合改为喝一碗胡辣汤（怪物照常反击）。
+        """
+        player = self.player
+        monster_hp = monster['hp']
+        start_hp = player.hp
+        damage = max(1, player.attack - monster['defense'])
+        monster_damage = max(1, monster['attack'] - player.defense)
+        crit_chance = player.critical_chance / 100
+        heal_threshold = player.maxhp * heal_below if heal_below is not None else None
+        combat_rng = self.combat_rng
+        turns = crits = soups = 0
+        victory = False
+
+        while True:
+            turns += 1
+            if heal_threshold is not None and player.hp < heal_threshold and player.items.get('胡辣汤', 0) > 0:
+                player.items['胡辣汤'] -= 1
+                player.heal_hp(HULATANG_HEAL)
+                soups += 1
+            else:
+                if combat_rng.random() < crit_chance:
+                    monster_hp -= damage * 2
+                    crits += 1
+                else:
+                    monster_hp -= damage
+                if monster_hp <= 0:
+                    victory = True
+                    break
+            player.hp -= monster_damage
+            if player.hp <= 0:
+                player.still_alive = False
+                break
+
+        hp_lost = start_hp - player.hp
+        summary = f"自动战斗：{turns}回合，暴击{crits}次，喝了{soups}碗胡辣汤，损失{hp_lost}点生命值"
+        if victory:
+            messages = [summary] + self._battle_rewards(monster)
+        else:
+            messages = [summary, "你被打败了..."]
+        return {"messages": messages, "monster_hp": monster_hp, "battle_over": True, "victory": victory,
+                "turns": turns, "crits": crits, "soups": soups, "hp_lost": hp_lost}
+
     def _find_equipment(self, distance):
         """发现装备"""
         # 可随机获取的装备列表
         rare_equipments = ["冻住的两掺", "中之剑"]
-        equip = random.choice(rare_equipments)
+        equip = self.loot_rng.choice(rare_equipments)
 
         if self.player.equipment[equip]['obtained']:
             return "你发现了一件装备，但已经拥有了"
@@ -146,7 +278,7 @@ class ExplorationEvents:
             ("attack_bonus", 10, "攻击力提升10点！"),
             ("gold_bonus", 20, "井盖获取增加20%！"),
         ]
-        attr, value, msg = random.choice(blessings)
+        attr, value, msg = self.event_rng.choice(blessings)
         setattr(self.player, attr, getattr(self.player, attr) + value)
         return f"获得祝福：{msg}"
 
@@ -156,7 +288,7 @@ class ExplorationEvents:
             ("maxhp_penalty", 5, "最大生命值减少5点！"),
             ("attack_penalty", 3, "攻击力减少3点！"),
         ]
-        attr, value, msg = random.choice(curses)
+        attr, value, msg = self.event_rng.choice(curses)
         self.player.curses[attr] += value
         self.player.update_derived_attributes()  # 重新计算属性
         return f"受到诅咒：{msg}"
@@ -0,0 +1,187 @@
+"""战斗模拟：用与 ExplorationEvents.battle_turn 相同的规则一次模拟大量独立的战斗，用于调整数值平衡
+
+每回合玩家先攻击（按暴击率造成双倍伤害），怪物未死则反击；战斗一直进行到一方倒下。
+装备「沾了胡辣汤的油条」时胜利后回满血量。战斗胜利带来的升级回血不计入模拟。
+"""
+import math
+import random
+from collections import Counter
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # 没有 numpy 时逐场模拟
+    np = None
+
+HEAL_WEAPON = "沾了胡辣汤的油条"  # 胜利后回满血量的武器
+
+
+def player_stats(player):
+    """从玩家对象提取战斗用的属性"""
+    return {
+        'hp': player.hp,
+        'maxhp': player.maxhp,
+        'attack': player.attack,
+        'defense': player.defense,
+        'critical_chance': player.critical_chance,
+        'heal_on_victory': player.equipped_weapon == HEAL_WEAPON,
+    }
+
+
+def battle_damage(stats, monster):
+    """返回 (玩家普通一击的伤害, 怪物每回合对玩家的伤害)"""
+    return max(1, stats['attack'] - monster['defense']), max(1, monster['attack'] - stats['defense'])
+
+
+def predict_battle(stats, monster):
+    """不做模拟，直接计算战斗结果的概率（结果按属性缓存，可在界面线程中随时调用）
+
+    返回胜率 'win_rate'、不考虑玩家倒下时击败怪物的期望回合数 'expected_turns_to_kill'、
+    战斗的期望回合数 'expected_turns' 和期望生命值损失 'expected_hp_loss'。
+    """
+    damage, monster_damage = battle_damage(stats, monster)
+    return dict(_predict(stats['hp'], stats['maxhp'], damage, monster['hp'], monster_damage,
+                         stats['critical_chance'], stats['heal_on_victory']))
+
+
+def describe_prediction(prediction):
+    """战斗提示中显示的预测文字"""
+    return (f"胜率约 {prediction['win_rate']:.0%}，"
+            f"预计 {prediction['expected_turns_to_kill']:.1f} 回合击败对手，"
+            f"预计损失 {max(0, prediction['expected_hp_loss']):.0f} 点生命值")
+
+
+def _binomial_cdf(k, n, p):
+    """P(Bin(n, p) <= k)"""
+    if k < 0:
+        return 0.0
+    if k >= n or p <= 0:
+        return 1.0
+    if p >= 1:
+        return 0.0
+    # 在对数空间中逐项递推，避免远距离时组合数溢出
+    log_odds = math.log(p) - math.log1p(-p)
+    log_pmf = n * math.log1p(-p)
+    total = math.exp(log_pmf)
+    for i in range(k):
+        log_pmf += math.log((n - i) / (i + 1)) + log_odds
+        total += math.exp(log_pmf)
+    return min(1.0, total)
+
+
+@lru_cache(maxsize=4096)
+def _predict(hp, maxhp, damage, monster_hp, monster_damage, crit_chance, heal_on_victory):
+    """设 m 为不暴击时击败怪物所需的攻击次数，n 次攻击中有 j 次暴击时造成 (n + j) 次普通伤害，
+    因此击败怪物所需的攻击次数 T 满足 P(T > n) = P(Bin(n, c) <= m - n - 1)。
+    玩家最多承受 K 次反击，第 K 次攻击前怪物未死则落败，所以胜率为 P(T <= K)。
+    """
+    crit = crit_chance / 100
+    hits_needed = -(-monster_hp // damage)  # m
+    survivable = max(0, -(-hp // monster_damage))  # K
+
+    def survival(n):  # P(T > n)
+        return _binomial_cdf(hits_needed - n - 1, n, crit)
+
+    win_rate = 1 - survival(survivable)
+    # 击败怪物的期望攻击次数按剩余普通伤害次数 u 递推：E(u) = 1 + (1 - c) E(u - 1) + c E(u - 2)
+    before_last, last = 0.0, 0.0
+    for _ in range(hits_needed):
+        before_last, last = last, 1 + (1 - crit) * last + crit * before_last
+    turns_to_kill = last
+    turns = sum(survival(n) for n in range(min(hits_needed, survivable)))
+    # 胜利时承受 T - 1 次反击，落败时承受 K 次
+    counter_hits = turns - win_rate
+    if heal_on_victory:
+        hp_loss = (1 - win_rate) * survivable * monster_damage + win_rate * (hp - maxhp)
+    else:
+        hp_loss = counter_hits * monster_damage
+    return (('win_rate', win_rate), ('expected_turns_to_kill', turns_to_kill),
+            ('expected_turns', turns), ('expected_hp_loss', hp_loss))
+
+
+def simulate_battles(stats, monster, battles=10000, seed=None):
+    """模拟 battles 场战斗，返回胜率、回合数分布和生命值损失
+
+    返回的字典中 'turns' 为每场战斗的回合数，'hp_left' 为每场战斗结束时玩家的生命值
+    （安装 numpy 时为数组，否则为列表）。
+    """
+    if np is not None:
+        victories, turns, hp_left = _simulate_numpy(stats, monster, battles, seed)
+        wins = int(victories.sum())
+        turn_counts = Counter(dict(zip(*(values.tolist() for values in np.unique(turns, return_counts=True)))))
+        hp_loss = float(stats['hp'] - hp_left.mean())
+    else:
+        victories, turns, hp_left = _simulate_python(stats, monster, battles, seed)
+        wins = sum(victories)
+        turn_counts = Counter(turns)
+        hp_loss = stats['hp'] - sum(hp_left) / battles
+
+    return {
+        'battles': battles,
+        'win_rate': wins / battles,
+        'mean_turns': sum(turn * count for turn, count in turn_counts.items()) / battles,
+        'turn_counts': dict(sorted(turn_counts.items())),
+        'expected_hp_loss': hp_loss,
+        'victories': victories,
+        'turns': turns,
+        'hp_left': hp_left,
+    }
+
+
+def _simulate_numpy(stats, monster, battles, seed):
+    """所有战斗同时推进：每回合只处理尚未结束的战斗"""
+    rng = np.random.default_rng(seed)
+    damage, monster_damage = battle_damage(stats, monster)
+    crit_chance = stats['critical_chance'] / 100
+
+    monster_hp = np.full(battles, monster['hp'], dtype=np.int64)
+    hp = np.full(battles, stats['hp'], dtype=np.int64)
+    turns = np.zeros(battles, dtype=np.int64)
+    victories = np.zeros(battles, dtype=bool)
+    active = np.arange(battles)
+    turn = 0
+    while active.size:
+        turn += 1
+        crits = rng.random(active.size) < crit_chance
+        monster_hp[active] -= np.where(crits, damage * 2, damage)
+
+        won = monster_hp[active] <= 0
+        winners = active[won]
+        victories[winners] = True
+        turns[winners] = turn
+
+        active = active[~won]
+        hp[active] -= monster_damage
+        lost = hp[active] <= 0
+        turns[active[lost]] = turn
+        active = active[~lost]
+
+    if stats['heal_on_victory']:
+        hp[victories] = stats['maxhp']
+    return victories, turns, hp
+
+
+def _simulate_python(stats, monster, battles, seed):
+    rng = random.Random(seed)
+    damage, monster_damage = battle_damage(stats, monster)
+    crit_chance = stats['critical_chance'] / 100
+
+    victories, turns, hp_left = [], [], []
+    for _ in range(battles):
+        monster_hp, hp, turn = monster['hp'], stats['hp'], 0
+        while True:
+            turn += 1
+            monster_hp -= damage * 2 if rng.random() < crit_chance else damage
+            if monster_hp <= 0:
+                won = True
+                break
+            hp -= monster_damage
+            if hp <= 0:
+                won = False
+                break
+        if won and stats['heal_on_victory']:
+            hp = stats['maxhp']
+        victories.append(won)
+        turns.append(turn)
+        hp_left.append(hp)
+    return victories, turns, hp_left
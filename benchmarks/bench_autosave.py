@@ -0,0 +1,60 @@
+"""自动存档测试：比较在主线程直接写完整存档与后台自动存档时主线程被占用的时间
+
+对每个地图尺寸新建一局（无种子，存档需要保存区域类型），随机探索一部分区域后：
+- 同步：调用 SaveGame.save()，主线程完成编码、压缩和 fsync；
+- 后台：每次探索后调用 autosave()，主线程只生成快照，写入由后台线程完成。
+输出两者在主线程上的耗时、后台写入耗时、写入与丢弃的快照数和存档大小。
+
+用法：python benchmarks/bench_autosave.py [尺寸 ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from engine import GameSession  # noqa: E402
+from map import GameMap  # noqa: E402
+from player import Player  # noqa: E402
+from savegame import SaveGame  # noqa: E402
+
+SNAPSHOTS = 200
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [101, 301, 1001]
+
+    print(f"{'尺寸':>6}{'区域数':>10}{'存档KB':>9}{'同步ms':>9}{'快照ms(平均/最大)':>20}"
+          f"{'后台写入ms':>12}{'写入/丢弃':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            session = GameSession(Player(), GameMap(map_size=size))
+            session.start('测试')
+            saver = SaveGame(session, os.path.join(directory, f'bench-{size}.sav'), autosave_interval=None)
+            saver.attach()
+            game_map = session.game_map
+            rand = random.Random(0)
+            for area_id in rand.sample(range(1, game_map.map_num + 1), game_map.map_num // 10):
+                game_map.mark_explored(area_id)
+            saver.append_delta()
+
+            start = time.perf_counter()
+            saver.save()
+            sync_ms = (time.perf_counter() - start) * 1000
+
+            for _ in range(SNAPSHOTS):
+                game_map.mark_explored(rand.randint(1, game_map.map_num))
+                saver.append_delta()
+                saver.autosave()
+            saver.close()  # 等后台线程写完（close 还会同步合并一次存档）
+            stats = saver.autosave_stats()
+
+            print(f"{size:>6}{game_map.map_num:>10}{stats['bytes'] / 1024:>9.1f}{sync_ms:>9.1f}"
+                  f"{stats['snapshot_ms']['mean']:>11.3f}/{stats['snapshot_ms']['max']:<8.3f}"
+                  f"{stats['write_ms']['mean']:>12.1f}{stats['written']:>7}/{stats['dropped']:<4}")
+
+
+if __name__ == "__main__":
+    main()
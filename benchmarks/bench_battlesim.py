@@ -0,0 +1,74 @@
+"""战斗模拟测试：比较逐回合调用 battle_turn 与 battlesim 批量模拟的结果和耗时
+
+对每个距离生成怪物，分别用 ExplorationEvents.battle_turn 逐场打完 N 场战斗
+（复制玩家，关闭升级）和用 battlesim.simulate_battles 一次模拟 N 场，
+输出两者的胜率、平均回合数、平均生命值损失和耗时。
+
+用法：python benchmarks/bench_battlesim.py [场数] [距离 ...]
+"""
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from attack import ExplorationEvents  # noqa: E402
+from battlesim import player_stats, simulate_battles  # noqa: E402
+from map import GameMap  # noqa: E402
+from player import Player  # noqa: E402
+from rng import RandomStreams  # noqa: E402
+
+
+def scalar_battles(player, events, monster, battles):
+    """用 battle_turn 逐场战斗，返回 (胜率, 平均回合数, 平均生命值损失)"""
+    wins = total_turns = total_loss = 0
+    for _ in range(battles):
+        fighter = copy.deepcopy(player)
+        fighter.xpForNextLevel = float('inf')  # 升级会回满血量，模拟中不计
+        events.player = fighter
+        target = dict(monster)
+        turns = 0
+        while True:
+            turns += 1
+            result = events.battle_turn(target)
+            target['hp'] = result['monster_hp']
+            if result['battle_over']:
+                break
+        wins += result['victory']
+        total_turns += turns
+        total_loss += player.hp - fighter.hp
+    return wins / battles, total_turns / battles, total_loss / battles
+
+
+def main():
+    battles = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    distances = [int(arg) for arg in sys.argv[2:]] or [1, 3, 6, 10]
+
+    player = Player()
+    player.init_equipment({})
+    game_map = GameMap(map_size=21)
+    game_map.initialize(player)
+    events = ExplorationEvents(player, game_map, RandomStreams(0))
+
+    print(f"{'距离':>4} {'怪物':<6}{'胜率(逐场/批量)':>18}{'回合':>14}{'生命损失':>16}{'耗时ms(逐场/批量)':>22}")
+    for distance in distances:
+        monster = events._create_monster(distance)
+
+        start = time.perf_counter()
+        scalar = scalar_battles(player, events, monster, battles)
+        scalar_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        batch = simulate_battles(player_stats(player), monster, battles, seed=0)
+        batch_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{distance:>4} {monster['name']:<6}"
+              f"{scalar[0]:>9.3f}/{batch['win_rate']:<8.3f}"
+              f"{scalar[1]:>7.2f}/{batch['mean_turns']:<6.2f}"
+              f"{scalar[2]:>8.2f}/{batch['expected_hp_loss']:<7.2f}"
+              f"{scalar_ms:>11.1f}/{batch_ms:<8.1f}")
+
+
+if __name__ == "__main__":
+    main()
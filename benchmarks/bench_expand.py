@@ -0,0 +1,64 @@
+"""地图扩展耗时测试：比较逐格生成与 numpy 批量生成新一圈区域的耗时
+
+只测量 expand_map 生成外圈的开销：地图先被设为目标尺寸减一圈（不生成内部区域），
+再扩展一圈到目标尺寸，因此测试本身不受已有区域占用内存的影响。
+
+用法：python benchmarks/bench_expand.py [地图尺寸 ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import map as map_module  # noqa: E402
+from map import GameMap  # noqa: E402
+
+BACKENDS = {
+    '字典': {},
+    '紧凑': {'compact': True},
+    '文件': {'path': None},  # 运行时替换为临时文件
+}
+
+
+def time_expand(map_size, options, vectorized, rings=1, repeat=5):
+    """返回扩展到 map_size 的最短耗时（毫秒）"""
+    saved_np = map_module.np
+    if not vectorized:
+        map_module.np = None
+    best = float('inf')
+    try:
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as tmp:
+                kwargs = dict(options)
+                if 'path' in kwargs:
+                    kwargs['path'] = os.path.join(tmp, 'bench.map')
+                game_map = GameMap(map_size=map_size - 2 * rings, **kwargs)
+                start = time.perf_counter()
+                game_map.expand_map(rings=rings)
+                best = min(best, time.perf_counter() - start)
+                game_map.close()
+    finally:
+        map_module.np = saved_np
+    return best * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [101, 501, 2001]
+    if map_module.np is None:
+        print("未安装 numpy，只能测试逐格生成")
+    print(f"{'尺寸':>6} {'存储':>4} {'逐格(ms)':>10} {'批量(ms)':>10} {'批量4圈(ms)':>12}")
+    for size in sizes:
+        for name, options in BACKENDS.items():
+            scalar = time_expand(size, options, vectorized=False)
+            if map_module.np is None:
+                print(f"{size:>6} {name:>4} {scalar:>10.2f}")
+                continue
+            batched = time_expand(size, options, vectorized=True)
+            batched4 = time_expand(size, options, vectorized=True, rings=4)
+            print(f"{size:>6} {name:>4} {scalar:>10.2f} {batched:>10.2f} {batched4:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""探索状态存储测试：比较区域字典、位图和 ExploredSet 每个区域占用的字节数，以及按圈计数的耗时
+
+对每个地图尺寸按两种方式标记已探索区域：
+- 扩散：距离老家不超过半径一半的区域全部探索（探索从老家向外扩散时的典型形状）；
+- 随机：随机探索 10% 的区域。
+输出字典区块（整张地图，探索标记是每个区域字典中的一项）、探索位图、zlib 压缩位图、
+ExploredSet 内存（tracemalloc 测得）与序列化后的字节/格，以及统计最外圈已探索数的耗时
+（扫描区域字典 / count_explored）。
+
+用法：python benchmarks/bench_explored.py [尺寸 ...]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from explored import ExploredSet  # noqa: E402
+from map import GameMap, spiral_coords  # noqa: E402
+from player import Player  # noqa: E402
+
+
+def explored_ids(map_num, radius, pattern):
+    if pattern == '扩散':
+        return [area_id for area_id in range(1, map_num + 1)
+                if sum(map(abs, spiral_coords(area_id))) <= radius // 2]
+    return sorted(random.Random(0).sample(range(1, map_num + 1), map_num // 10))
+
+
+def measure_dict_map(size):
+    """返回 (字典地图, 每个区域的平均字节数)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    game_map = GameMap(map_size=size)
+    game_map.initialize(Player())
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return game_map, used / game_map.map_num
+
+
+def measure_set(ids):
+    """返回 (ExploredSet, 占用字节数)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    explored = ExploredSet(ids)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return explored, used
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [101, 301, 501]
+
+    print(f"{'尺寸':>6}{'方式':>6}{'已探索':>9}{'字典':>8}{'位图':>8}{'zlib位图':>10}{'集合内存':>10}{'序列化':>9}"
+          f"{'  最外圈计数us(扫描/popcount)':<28}  容器")
+    for size in sizes:
+        game_map, dict_bytes = measure_dict_map(size)
+        map_num = game_map.map_num
+        radius = game_map.radius
+        first, last = (2 * radius - 1) ** 2 + 1, map_num  # 最外圈的编号区间
+        for pattern in ('扩散', '随机'):
+            ids = explored_ids(map_num, radius, pattern)
+            for area_id in ids:
+                game_map.mark_explored(area_id)
+            explored, set_bytes = measure_set(ids)
+
+            bits = bytearray((map_num + 7) // 8)
+            for area_id in ids:
+                bits[(area_id - 1) >> 3] |= 1 << ((area_id - 1) & 7)
+            explored.optimize()
+            serialized = explored.serialize()
+
+            start = time.perf_counter()
+            scanned = sum(game_map.get_area(area_id)['explored'] for area_id in range(first, last + 1))
+            scan_us = (time.perf_counter() - start) * 1e6
+            start = time.perf_counter()
+            counted = game_map.count_explored(first, last)
+            count_us = (time.perf_counter() - start) * 1e6
+            assert scanned == counted
+
+            print(f"{size:>6}{pattern:>6}{len(ids):>9}{dict_bytes:>8.1f}{len(bits) / map_num:>8.3f}"
+                  f"{len(zlib.compress(bytes(bits))) / map_num:>10.4f}{set_bytes / map_num:>10.4f}"
+                  f"{len(serialized) / map_num:>9.4f}{scan_us:>14.0f}/{count_us:<12.1f}  {explored.container_kinds()}")
+
+            # 还原成未探索，下一种方式从头开始
+            game_map = GameMap(map_size=size)
+            game_map.initialize(Player())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""核心热点路径的 pytest-benchmark 测试，与保存的基线比较，发现每个操作耗时的退化
+
+覆盖 GameMap.expand_map / check_all_explored（不同地图尺寸）、ExplorationEvents.explore_area / battle_turn、
+Player.calculate_equipment_bonus / add_xp，以及 QT_QPA_PLATFORM=offscreen 下的 GameWindow.update_map_display
+（未安装 PySide6 时跳过）。需要安装 pytest-benchmark。
+另有几项往返检查（读档、ExploredSet 序列化、操作日志回放），计时的同时断言结果与原来完全相同，
+只变快但结果出错的改动不能通过。
+
+在仓库根目录运行：
+    与基线比较（中位数慢 25% 以上即失败）：
+        python -m pytest benchmarks/bench_hotpaths.py --benchmark-storage=benchmarks/baselines \\
+            --benchmark-compare=0001 --benchmark-compare-fail=median:25%
+    更新基线（在同一台机器上运行，结果保存到 benchmarks/baselines/<机器>/）：
+        python -m pytest benchmarks/bench_hotpaths.py --benchmark-storage=benchmarks/baselines \\
+            --benchmark-save=baseline
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from engine import GameSession  # noqa: E402
+from explored import ExploredSet  # noqa: E402
+from item import EQUIPMENT_TEMPLATE  # noqa: E402
+from journal import ActionJournal, replay  # noqa: E402
+from map import GameMap  # noqa: E402
+from player import Player  # noqa: E402
+from savegame import SaveGame, load_game, read_save  # noqa: E402
+
+MAP_SIZES = [11, 51, 201, 401]
+SUIT = ["井盖面甲", "井盖肚兜", "井盖内裤", "井盖臭鞋"]
+
+
+def new_map(size):
+    game_map = GameMap(map_size=size, seed=0)
+    game_map.initialize(Player())
+    return game_map
+
+
+def play(session, actions, seed=0):
+    """按固定的随机序列玩 actions 步（移动、探索、战斗、逃跑、换装备、复活）"""
+    rand = random.Random(seed)
+    session.start('WEP')  # 管理员模式：获得全部装备，能走得更远
+    for _ in range(actions):
+        if session.state == 'explore':
+            choice = rand.random()
+            if choice < 0.5:
+                session.move(rand.choice(['up', 'down', 'left', 'right']))
+            elif choice < 0.9:
+                session.explore()
+            else:
+                session.toggle_equipment(rand.choice(list(session.player.equipment)))
+        elif session.state == 'encounter':
+            (session.fight if rand.random() < 0.8 else session.flee)()
+        elif session.state == 'battle':
+            (session.attack if rand.random() < 0.5 else session.auto_battle)()
+        elif session.can_resurrect():
+            session.resurrect()
+        else:
+            break
+
+
+def game_state(session):
+    """比较两局游戏用的完整状态"""
+    game_map = session.game_map
+    return (vars(session.player), session.state, session.monster, game_map.map_size,
+            list(game_map.explored_ids), dict(game_map.unexplored_by_distance),
+            [game_map.get_area(area_id)['type'] for area_id in range(1, game_map.map_num + 1)])
+
+
+@pytest.fixture
+def session():
+    return GameSession(seed=0, map_size=301)
+
+
+@pytest.mark.benchmark(group='expand_map')
+@pytest.mark.parametrize('size', MAP_SIZES)
+def test_expand_map(benchmark, size):
+    # 每轮新建一张 size 尺寸的地图，只计扩展一圈的时间
+    benchmark.pedantic(lambda game_map: game_map.expand_map(), setup=lambda: ((new_map(size),), {}),
+                       rounds=10 if size > 100 else 50)
+
+
+@pytest.mark.benchmark(group='check_all_explored')
+@pytest.mark.parametrize('size', MAP_SIZES)
+def test_check_all_explored(benchmark, size):
+    game_map = new_map(size)
+    assert benchmark(game_map.check_all_explored) is False
+
+
+@pytest.mark.benchmark(group='events')
+def test_explore_area(benchmark, session):
+    # 每次探索一个新区域（已探索的区域直接返回，不能重复使用）
+    area_ids = iter(range(2, session.game_map.map_num + 1))
+    events = session.events
+    benchmark.pedantic(lambda: events.explore_area(next(area_ids)), rounds=50, iterations=1000)
+
+
+@pytest.mark.benchmark(group='events')
+def test_battle_turn(benchmark, session):
+    # 双方血量足够多，战斗不会结束
+    session.player.hp = 10 ** 12
+    monster = session.events._create_monster(10)
+    monster['hp'] = 10 ** 12
+    result = benchmark(session.events.battle_turn, monster)
+    assert not result['battle_over']
+
+
+@pytest.mark.benchmark(group='player')
+def test_calculate_equipment_bonus(benchmark):
+    player = Player()
+    player.init_equipment(dict(EQUIPMENT_TEMPLATE))
+    player.equipped_armors = list(SUIT)
+    player.equipped_weapon = '中之剑'
+    benchmark(player.calculate_equipment_bonus)
+
+
+@pytest.mark.benchmark(group='player')
+def test_add_xp(benchmark):
+    player = Player()
+    player.init_equipment(dict(EQUIPMENT_TEMPLATE))
+    player.xpForNextLevel = 10 ** 12  # 只计累加经验，不升级
+    benchmark(player.add_xp, 1)
+
+
+@pytest.mark.benchmark(group='player')
+def test_add_xp_level_up(benchmark):
+    # 每轮一个新玩家，一次获得连升三级的经验
+    def setup():
+        player = Player()
+        player.init_equipment(dict(EQUIPMENT_TEMPLATE))
+        xp = player.xpForNextLevel
+        return (player, int(xp + xp * 1.5 + xp * 2.25)), {}
+
+    benchmark.pedantic(lambda player, xp: player.add_xp(xp), setup=setup, rounds=2000)
+
+
+@pytest.mark.benchmark(group='gui')
+def test_update_map_display(benchmark, session, tmp_path, monkeypatch):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    QtWidgets = pytest.importorskip('PySide6.QtWidgets')
+    from gamewindow import GameWindow
+
+    monkeypatch.chdir(tmp_path)  # 游戏日志写到临时目录
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    window = GameWindow(session)
+    window.show()
+    window.name_edit.setPlainText('测试')
+    window.confirm_name()
+    app.processEvents()
+
+    def refresh():
+        # update_map_display 只安排重绘，repaint 让绘制立即完成并计入耗时
+        window.update_map_display()
+        window.map_widget.repaint()
+        window.minimap.repaint()
+
+    benchmark(refresh)
+    window.close()
+
+
+@pytest.mark.benchmark(group='round_trip')
+@pytest.mark.parametrize('seeded', [True, False])
+def test_save_load_round_trip(benchmark, tmp_path, seeded):
+    # 完整存档之后还有增量记录，读档要把两者合起来才能得到原来的状态
+    game_map = GameMap(map_size=5, seed=1 if seeded else None)
+    session = GameSession(Player(), game_map, seed=1)
+    saver = SaveGame(session, str(tmp_path / 'round.sav'), autosave_interval=None)
+    saver.attach()
+    play(session, 1500)
+    assert read_save(saver.path)['deltas'] > 0 and game_map.map_size > 5  # 增量中包括地图扩展
+
+    loaded = benchmark(load_game, saver.path)
+    assert game_state(loaded) == game_state(session)
+    saver.close()
+
+
+@pytest.mark.benchmark(group='round_trip')
+def test_explored_set_round_trip(benchmark):
+    # 三种容器都出现：连续段（老家附近）、数组（稀疏）和位图（稠密而分散）
+    rand = random.Random(0)
+    values = set(range(1, 30000))
+    values.update(rand.sample(range(70000, 130000), 500))
+    values.update(rand.sample(range(140000, 200000), 20000))
+    explored = ExploredSet(values)
+    assert set(explored.container_kinds()) == {'RunContainer', 'ArrayContainer', 'BitmapContainer'}
+
+    restored, end = benchmark(lambda: ExploredSet.deserialize(explored.serialize()))
+    assert end == len(explored.serialize())
+    assert list(restored) == sorted(values) and len(restored) == len(values)
+    for first, last in [(1, 29999), (25000, 75000), (131072, 200000), (0, 10 ** 6)]:
+        expected = sum(1 for value in values if first <= value <= last)
+        assert restored.count(first, last) == explored.count(first, last) == expected
+
+
+@pytest.mark.benchmark(group='round_trip')
+def test_journal_replay(benchmark, tmp_path):
+    # 回放操作日志得到与原来完全相同的一局
+    journal = ActionJournal(str(tmp_path / 'round.jnl'))
+    session = GameSession(seed=2, map_size=5, journal=journal)
+    play(session, 1500)
+    journal.close()
+
+    result = benchmark(replay, journal.path)
+    assert result['failed'] == 0 and result['actions'] == journal.actions
+    assert game_state(result['session']) == game_state(session)
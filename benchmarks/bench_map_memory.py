@@ -0,0 +1,36 @@
+"""地图存储内存测试：比较字典区块与紧凑区块每个区域占用的字节数
+
+用法：python benchmarks/bench_map_memory.py [地图尺寸 ...]
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from map import GameMap  # noqa: E402
+from player import Player  # noqa: E402
+
+
+def measure(map_size, compact):
+    """返回 (区域数, 每个区域的平均字节数)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    game_map = GameMap(map_size=map_size, compact=compact)
+    game_map.initialize(Player())
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return game_map.map_num, used / game_map.map_num
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [101, 301, 501]
+    print(f"{'尺寸':>6} {'区域数':>10} {'字典(字节/格)':>14} {'紧凑(字节/格)':>14}")
+    for size in sizes:
+        cells, dict_bytes = measure(size, compact=False)
+        _, compact_bytes = measure(size, compact=True)
+        print(f"{size:>6} {cells:>10} {dict_bytes:>14.1f} {compact_bytes:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""启动耗时测试：比较终端版和图形界面版从启动进程到可以操作的冷启动耗时
+
+每次测量都启动一个新的 Python 进程：
+终端版运行 main.py --tui 并立即结束输入，进程在显示名字输入提示后退出；
+图形界面版构建游戏并显示主窗口，处理完第一轮事件后退出。
+没有显示器时图形界面版使用 offscreen 平台。
+进程在临时目录中运行，操作日志、存档和游戏日志都写到临时目录，不会读取或改动仓库中已有的存档。
+
+用法：python benchmarks/bench_startup.py [重复次数]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+GUI_CODE = """
+import sys
+import main
+from PySide6.QtWidgets import QApplication
+from gamewindow import GameWindow
+session = main.build_session()
+app = QApplication(sys.argv)
+window = GameWindow(session)
+window.show()
+app.processEvents()
+window.close()
+"""
+
+MODES = {
+    '终端版': [sys.executable, os.path.join(ROOT, 'main.py'), '--tui', '--new'],
+    '图形界面版': [sys.executable, '-c', GUI_CODE],
+}
+
+
+def time_startup(command, repeat):
+    """返回每次启动耗时（毫秒）"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    if not env.get('DISPLAY') and not env.get('WAYLAND_DISPLAY'):
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    samples = []
+    with tempfile.TemporaryDirectory() as directory:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=directory, env=env, stdin=subprocess.DEVNULL,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'模式':<8}{'最短(ms)':>10}{'中位数(ms)':>12}")
+    for name, command in MODES.items():
+        try:
+            samples = time_startup(command, repeat)
+        except subprocess.CalledProcessError:
+            print(f"{name:<8}{'启动失败':>10}")
+            continue
+        print(f"{name:<8}{min(samples):>10.1f}{statistics.median(samples):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+import functools
+
+from player import Player
+from map import GameMap
+from attack import ExplorationEvents
+from item import ItemSystem, SHOP_ITEMS
+from battlesim import player_stats, predict_battle
+from rng import RandomStreams
+
+# 移动方向对应的坐标变化
+DIRECTIONS = {
+    'up': (0, -1),
+    'down': (0, 1),
+    'left': (-1, 0),
+    'right': (1, 0),
+}
+ADMIN_NAME = "WEP"  # 管理员模式名字
+ADMIN_GOLD = 9999
+RESURRECT_COST = 88  # 复活花费的井盖
+ENCOUNTER_FLEE_DAMAGE = 5  # 遭遇时拒绝战斗损失的生命值
+BATTLE_FLEE_DAMAGE = 2  # 战斗中逃跑损失的生命值
+AUTO_HEAL_BELOW = 0.3  # 自动战斗时生命值低于最大生命值的这个比例就喝胡辣汤
+JINGGAI_SUIT = ["井盖面甲", "井盖肚兜", "井盖内裤", "井盖臭鞋"]
+
+
+def has_jinggai_suit(player):
+    """是否穿齐井盖套装"""
+    return len(player.equipped_armors) == 4 and all(armor in player.equipped_armors for armor in JINGGAI_SUIT)
+
+
+def journaled(method):
+    """把执行成功的玩家操作写入会话的操作日志并通知 action_listeners（操作内部调用的其他操作不重复记录）"""
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        self._action_depth += 1
+        try:
+            result = method(self, *args)
+        finally:
+            self._action_depth -= 1
+        if result['ok'] and self._action_depth == 0:
+            if self.journal is not None:
+                self.journal.record(method.__name__, *args)
+            for listener in self.action_listeners:
+                listener(method.__name__, args)
+        return result
+    return wrapper
+
+
+class GameSession:
+    """不依赖界面的游戏引擎：持有玩家、地图和探索事件，所有操作都是普通方法调用
+
+    每个操作返回一个字典，至少包含 'ok'（操作是否执行）和 'messages'（要显示的文字列表），
+    界面只负责显示这些结果。state 为当前阶段：
+    'explore' 自由探索，'encounter' 遇到怪物等待选择战斗或逃跑，'battle' 战斗中，'dead' 已倒下。
+    """
+
+    def __init__(self, player=None, game_map=None, events=None, item_system=None, seed=None,
+                 map_size=5, journal=None, prefetch=False):
+        # 随机数流：传入 events 时沿用其随机数流，否则按 seed 新建（seed 相同则整局游戏可复现）
+        self.rng = events.rng if events is not None else RandomStreams(seed)
+        self.player = player if player is not None else Player()
+        self.game_map = game_map if game_map is not None else GameMap(map_size=map_size, rng=self.rng)
+        if self.game_map.player is None:
+            self.game_map.initialize(self.player)
+        self.item_system = item_system if item_system is not None else ItemSystem(self.player, self.game_map)
+        self.events = events if events is not None else ExplorationEvents(self.player, self.game_map, self.rng)
+        self.state = 'explore'
+        self.monster = None
+        self.started = False  # 已设置名字开始游戏（读取的存档也视为已开始）
+        # 操作日志（journal.ActionJournal），记录玩家的每个操作以便回放
+        self.journal = journal
+        self.action_listeners = []  # 每个成功的操作之后调用 listener(操作名, 参数)，如自动存档
+        self._action_depth = 0
+        # 是否在后台线程提前生成外圈（界面版开启；默认关闭，无界面调用保持同步、不产生线程）
+        self.prefetch = prefetch
+        if journal is not None:
+            journal.begin(self)
+
+    def _result(self, ok=True, messages=None, **fields):
+        result = {'ok': ok, 'messages': messages if messages is not None else []}
+        result.update(fields)
+        return result
+
+    def current_area(self):
+        return self.game_map.get_area(self.player.locationID)
+
+    def at_home(self):
+        area = self.current_area()
+        return area is not None and area['type'] == '老家'
+
+    @journaled
+    def start(self, name):
+        """设置主角名字并开始游戏（名字为 WEP 时激活管理员模式）"""
+        name = name.strip()
+        if not name:
+            return self._result(False)
+
+        messages = []
+        self.player.name = name
+        self.started = True
+        admin = name == ADMIN_NAME
+        if admin:
+            messages.append("\n【管理员模式激活】已自动获得所有装备！")
+            for eq_name in self.player.equipment.keys():
+                self.player.equipment[eq_name]['obtained'] = True
+            self.player.gold = ADMIN_GOLD
+
+        # 初始化属性
+        self.player.update_derived_attributes()
+
+        messages.append(f"\n你的游戏主角名字叫 {self.player.name}。")
+        messages.append(
+            f"初始属性: 生命值 {self.player.hp}/{self.player.maxhp}, 攻击力 {self.player.attack}, 防御力 {self.player.defense}")
+        messages.append(f"你现在有 {self.player.gold} 个井盖，身上没有任何消耗品。")
+        if admin:
+            messages.append("✅ 管理员福利：所有装备已解锁，可在「装备管理」中装备")
+        messages.append(f"\n你的冒险开始于老家，去探索河南的更多地方吧...")
+        return self._result(True, messages, admin=admin)
+
+    def describe(self):
+        """当前位置与装备状态的描述"""
+        current_area = self.current_area()
+        if not current_area:
+            return self._result(False, ["警告：无效的位置信息"])
+
+        is_explored = "已探索" if current_area["explored"] else "未探索"
+        messages = [
+            f"\n当前位置: {current_area['type']}",
+            f"(X: {self.player.locationX}, Y: {self.player.locationY}) 该区域状态：{is_explored}",
+            f"距离老家: {current_area['distance_from_home']} 步",
+        ]
+        if current_area['type'] == '老家':
+            messages.append("你现在可以休息恢复生命值，也可以去井盖商店购物！")
+
+        # 装备状态
+        armor_count = len(self.player.equipped_armors)
+        weapon = self.player.equipped_weapon or "无"
+        messages.append(f"当前装备：甲胄({armor_count}/4) | 武器：{weapon}")
+        if has_jinggai_suit(self.player):
+            messages.append("✅ 井盖套装生效：血量+50% | 诅咒概率-50%")
+        return self._result(True, messages)
+
+    @journaled
+    def move(self, direction):
+        """向 up/down/left/right 移动一格，越过地图边缘时从另一侧绕回"""
+        if self.state != 'explore' or direction not in DIRECTIONS:
+            return self._result(False)
+
+        # 世界坐标以老家为原点
+        radius = self.game_map.radius
+        dx, dy = DIRECTIONS[direction]
+        x = self.player.locationX + dx
+        y = self.player.locationY + dy
+        if x > radius:
+            x = -radius
+        elif x < -radius:
+            x = radius
+        if y > radius:
+            y = -radius
+        elif y < -radius:
+            y = radius
+
+        # 验证位置有效性
+        area = self.game_map.get_area_at(x, y)
+        if area is None:
+            return self._result(False, ["移动出错，已恢复原位置"])
+        from_x, from_y = self.player.locationX, self.player.locationY
+        self.player.set_location(x, y, area['mapID'])
+        return self._result(True, x=x, y=y, area_id=area['mapID'], moved_from=(from_x, from_y))
+
+    @journaled
+    def explore(self):
+        """探索当前区域；遇到怪物时进入 encounter 阶段并附带战斗预测，地图全部探索后自动扩展"""
+        if self.state != 'explore':
+            return self._result(False)
+
+        x, y = self.player.locationX, self.player.locationY
+        result = self.events.explore_area(self.player.locationID)
+        messages = []
+        monster = prediction = None
+        if isinstance(result, dict) and result.get("type") == "battle":
+            monster = result["monster"]
+            prediction = self.predict(monster)
+            self.monster = monster
+            self.state = 'encounter'
+        else:
+            messages.append(result)
+
+        expanded = self.game_map.check_all_explored()
+        if expanded:
+            messages.append("\n恭喜你！已探索当前所有区域，地图正在扩展...")
+            self.game_map.expand_map()
+            self.start_prefetch()  # 后台提前生成下一圈
+            messages.append("地图已扩展！新的区域等待你的探索！")
+        return self._result(True, messages, monster=monster, prediction=prediction, expanded=expanded, x=x, y=y)
+
+    def start_prefetch(self):
+        """开启 prefetch 时在后台提前生成当前地图之外的几圈"""
+        if self.prefetch:
+            self.game_map.start_prefetch()
+
+    def predict(self, monster=None):
+        """按玩家当前属性预测与怪物战斗的结果（胜率、回合数、生命值损失）"""
+        return predict_battle(player_stats(self.player), monster or self.monster)
+
+    @journaled
+    def fight(self):
+        """接受遭遇的战斗"""
+        if self.state != 'encounter':
+            return self._result(False)
+        self.state = 'battle'
+        return self._result(True, [f"\n进入战斗！对手是 {self.monster['name']} (HP: {self.monster['hp']})。"])
+
+    def _check_defeat(self):
+        """生命值耗尽时进入 dead 阶段"""
+        if self.player.hp > 0:
+            return False
+        self.player.still_alive = False
+        self.state = 'dead'
+        self.monster = None
+        return True
+
+    @journaled
+    def flee(self):
+        """逃跑：遭遇时拒绝战斗损失 5 点生命值，战斗中逃跑损失 2 点"""
+        if self.state == 'encounter':
+            damage = ENCOUNTER_FLEE_DAMAGE
+        elif self.state == 'battle':
+            damage = BATTLE_FLEE_DAMAGE
+        else:
+            return self._result(False)
+
+        self.player.hp -= damage
+        messages = [f"你选择了逃跑，损失了{damage}点生命值。剩余生命值：{self.player.hp}"]
+        if self._check_defeat():
+            messages.append("你因伤势过重而倒下...")
+            return self._result(True, messages, dead=True)
+        if self.state == 'battle':
+            messages.append("你逃离了战斗。")
+        self.state = 'explore'
+        self.monster = None
+        return self._result(True, messages, dead=False)
+
+    @journaled
+    def attack(self):
+        """战斗中攻击一回合"""
+        if self.state != 'battle':
+            return self._result(False)
+
+        monster = self.monster
+        result = self.events.battle_turn(monster)
+        monster['hp'] = result['monster_hp']
+        messages = list(result['messages'])
+        victory = result['victory']
+        if victory:
+            messages.append("战斗胜利！")
+            self.state = 'explore'
+            self.monster = None
+        elif not self._check_defeat():
+            messages.append(f"\n{monster['name']} 剩余生命值: {monster['hp']}")
+            messages.append(f"你的剩余生命值: {self.player.hp}")
+        return self._result(True, messages, battle_over=self.state != 'battle', victory=victory,
+                            dead=self.state == 'dead')
+
+    @journaled
+    def use_battle_item(self):
+        """战斗中喝胡辣汤，成功后怪物反击一次"""
+        if self.state != 'battle':
+            return self._result(False)
+
+        result = self.item_system.use_consumable('胡辣汤')
+        messages = [result]
+        if "恢复了" in result:  # 判断是否使用成功
+            monster_damage = max(1, self.monster['attack'] - self.player.defense)
+            self.player.hp -= monster_damage
+            messages.append(f"{self.monster['name']}对你造成{monster_damage}点伤害")
+            self._check_defeat()
+        return self._result(True, messages, dead=self.state == 'dead')
+
+    @journaled
+    def auto_battle(self, heal_below=AUTO_HEAL_BELOW):
+        """自动打完当前战斗（遭遇时直接开战），只返回战斗摘要和奖励"""
+        if self.state not in ('encounter', 'battle'):
+            return self._result(False)
+
+        messages = self.fight()['messages'] if self.state == 'encounter' else []
+        result = self.events.auto_battle(self.monster, heal_below)
+        self.monster['hp'] = result['monster_hp']
+        messages.extend(result['messages'])
+        if result['victory']:
+            self.state = 'explore'
+            self.monster = None
+        else:
+            self._check_defeat()
+        return self._result(True, messages, battle_over=True, victory=result['victory'],
+                            dead=self.state == 'dead', turns=result['turns'])
+
+    def can_resurrect(self):
+        return self.state == 'dead' and self.player.gold >= RESURRECT_COST
+
+    @journaled
+    def resurrect(self):
+        """花费 88 个井盖原地复活，恢复一半生命值"""
+        if not self.can_resurrect():
+            return self._result(False)
+        self.player.gold -= RESURRECT_COST
+        self.player.hp = self.player.maxhp // 2
+        self.player.still_alive = True
+        self.state = 'explore'
+        return self._result(True, [f"你消耗了{RESURRECT_COST}个井盖，原地复活了！"])
+
+    @journaled
+    def rest(self):
+        """在老家休息回满生命值"""
+        if self.state != 'explore':
+            return self._result(False)
+        if not self.at_home():
+            return self._result(False, ["只有在老家才能休息恢复生命值"])
+        healed = self.player.heal_hp()
+        return self._result(True, [f"在老家休息，恢复了{healed}点生命值！"], healed=healed)
+
+    def items(self):
+        """背包物品列表"""
+        if not self.player.items:
+            return self._result(True, ["你的背包是空的"])
+        item_list = [f"{item}: {count}个" for item, count in self.player.items.items()]
+        return self._result(True, ["背包物品：\n" + "\n".join(item_list)])
+
+    def usable_items(self):
+        return [name for name, count in self.player.items.items() if count > 0]
+
+    @journaled
+    def use_item(self, item_name):
+        """使用背包中的消耗品"""
+        if self.state != 'explore':
+            return self._result(False)
+        location = self.player.locationID
+        result = self.item_system.use_consumable(item_name)
+        return self._result(True, [result], moved=self.player.locationID != location)
+
+    def can_shop(self):
+        return self.state == 'explore' and self.at_home()
+
+    @journaled
+    def buy(self, item_name):
+        """在老家井盖商店购买商品"""
+        if not self.can_shop():
+            return self._result(False, ["只有在老家才能进入井盖商店"])
+        gold = self.player.gold
+        result = self.item_system.buy_item(item_name, SHOP_ITEMS)
+        return self._result(self.player.gold != gold, [result])
+
+    @journaled
+    def toggle_equipment(self, eq_name):
+        """装备或卸下一件已获得的装备，'title' 为结果标题"""
+        eq_info = self.player.equipment.get(eq_name)
+        if eq_info is None or not eq_info['obtained']:
+            return self._result(False, [f"你还没有获得{eq_name}"], title="装备失败")
+
+        # 卸下装备
+        if eq_info['type'] == 'armor' and eq_name in self.player.equipped_armors:
+            self.player.equipped_armors.remove(eq_name)
+            message, title = f"已卸下甲胄：{eq_name}", "操作成功"
+        elif eq_info['type'] == 'weapon' and eq_name == self.player.equipped_weapon:
+            self.player.equipped_weapon = None
+            message, title = f"已卸下武器：{eq_name}", "操作成功"
+        # 装备物品
+        elif eq_info['type'] == 'armor':
+            if len(self.player.equipped_armors) >= 4:
+                return self._result(False, ["甲胄最多只能装备4件！"], title="装备失败")
+            self.player.equipped_armors.append(eq_name)
+            message, title = f"已装备甲胄：{eq_name}", "操作成功"
+        else:
+            if self.player.equipped_weapon is not None:
+                return self._result(False, [f"已装备武器：{self.player.equipped_weapon}，请先卸下！"],
+                                    title="装备失败")
+            self.player.equipped_weapon = eq_name
+            if eq_name == "中之剑":
+                message, title = "✅ 中之剑特效：所有操作前将输出「中！」", "神器激活"
+            else:
+                message, title = f"已装备武器：{eq_name}", "操作成功"
+
+        self.player.update_derived_attributes()
+        return self._result(True, [message], title=title)
+
+    def status(self):
+        """角色状态"""
+        player = self.player
+        status = [
+            f"角色状态 - {player.name} Lv.{player.level}",
+            f"生命值: {player.hp}/{player.maxhp}",
+            f"攻击力: {player.attack} (基础+装备)",
+            f"防御力: {player.defense}",
+            f"井盖数量: {player.gold}",
+            f"经验值: {player.xp}/{player.xpForNextLevel}",
+            f"属性: 力量{player.strength} 敏捷{player.agility} "
+            f"活力{player.vitality} 运气{player.luck}"
+        ]
+        return self._result(True, ["\n".join(status)])
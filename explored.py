@@ -0,0 +1,440 @@
+"""已探索区域的压缩集合（roaring bitmap 的做法）
+
+区域编号按圈从老家向外递增，探索也从老家向外扩散，已探索的编号大多连成一段一段。
+集合按编号的高 16 位分块，每块 65536 个编号用三种容器中最省空间的一种保存：
+    ArrayContainer   有序的 16 位数组，元素少时使用（每个 2 字节）
+    BitmapContainer  8KB 位图，元素多而分散时使用
+    RunContainer     连续段列表（每段 4 字节），连成片时使用
+计数用 popcount，复制为写时复制（只复制块表，修改某块时才复制该块）。
+序列化格式：块数(<I)，之后每块 块号(<I) 容器种类(<B) 元素数或段数(<I) 内容（小端）。
+"""
+import bisect
+import struct
+import sys
+from array import array
+
+BLOCK_SIZE = 1 << 16
+BITMAP_BYTES = BLOCK_SIZE // 8
+ARRAY_MAX = 4096  # 超过后数组比位图大
+_HEADER = struct.Struct('<I')
+_BLOCK = struct.Struct('<IBI')
+
+
+def _le(values):
+    """16 位数组 -> 小端字节"""
+    if sys.byteorder == 'big':
+        values = array('H', values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le(data):
+    values = array('H')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _unpack(layout, data, offset):
+    """layout.unpack_from，数据不够时抛出 ValueError"""
+    if offset + layout.size > len(data):
+        raise ValueError("数据不完整")
+    return layout.unpack_from(data, offset)
+
+
+def _take(data, offset, size):
+    """data[offset:offset + size]，数据不够时抛出 ValueError"""
+    if offset + size > len(data):
+        raise ValueError("数据不完整")
+    return data[offset:offset + size]
+
+
+def _runs(values):
+    """有序的值 -> [(起点, 终点)]（含终点）"""
+    runs = []
+    for value in values:
+        if runs and runs[-1][1] == value - 1:
+            runs[-1][1] = value
+        else:
+            runs.append([value, value])
+    return runs
+
+
+class ArrayContainer:
+    __slots__ = ('values',)
+    kind = 0
+
+    def __init__(self, values=()):
+        self.values = array('H', values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, low):
+        values = self.values
+        index = bisect.bisect_left(values, low)
+        return index < len(values) and values[index] == low
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def add(self, low):
+        values = self.values
+        index = bisect.bisect_left(values, low)
+        if index < len(values) and values[index] == low:
+            return False
+        values.insert(index, low)
+        return True
+
+    def discard(self, low):
+        values = self.values
+        index = bisect.bisect_left(values, low)
+        if index < len(values) and values[index] == low:
+            del values[index]
+            return True
+        return False
+
+    def count(self, first, last):
+        return bisect.bisect_right(self.values, last) - bisect.bisect_left(self.values, first)
+
+    def nbytes(self):
+        return 2 * len(self.values)
+
+    def copy(self):
+        return ArrayContainer(self.values)
+
+    def payload(self):
+        return len(self.values), _le(self.values)
+
+
+class BitmapContainer:
+    __slots__ = ('bits', 'cardinality')
+    kind = 1
+
+    def __init__(self, values=()):
+        self.bits = bytearray(BITMAP_BYTES)
+        self.cardinality = 0
+        for low in values:
+            self.add(low)
+
+    def __len__(self):
+        return self.cardinality
+
+    def __contains__(self, low):
+        return bool(self.bits[low >> 3] >> (low & 7) & 1)
+
+    def __iter__(self):
+        for index, byte in enumerate(self.bits):
+            if byte:
+                base = index << 3
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield base + bit
+
+    def add(self, low):
+        mask = 1 << (low & 7)
+        if self.bits[low >> 3] & mask:
+            return False
+        self.bits[low >> 3] |= mask
+        self.cardinality += 1
+        return True
+
+    def discard(self, low):
+        mask = 1 << (low & 7)
+        if not self.bits[low >> 3] & mask:
+            return False
+        self.bits[low >> 3] &= ~mask & 0xFF
+        self.cardinality -= 1
+        return True
+
+    def count(self, first, last):
+        # 取出覆盖 [first, last] 的字节，移位去掉两端多余的位后做 popcount
+        word = int.from_bytes(self.bits[first >> 3:(last >> 3) + 1], 'little') >> (first & 7)
+        return (word & ((1 << (last - first + 1)) - 1)).bit_count()
+
+    def nbytes(self):
+        return BITMAP_BYTES
+
+    def copy(self):
+        container = BitmapContainer()
+        container.bits[:] = self.bits
+        container.cardinality = self.cardinality
+        return container
+
+    def payload(self):
+        return self.cardinality, bytes(self.bits)
+
+
+class RunContainer:
+    __slots__ = ('starts', 'ends', 'cardinality')
+    kind = 2
+
+    def __init__(self, values=()):
+        runs = _runs(values)
+        self.starts = array('H', (start for start, _ in runs))
+        self.ends = array('H', (end for _, end in runs))
+        self.cardinality = sum(end - start + 1 for start, end in runs)
+
+    def __len__(self):
+        return self.cardinality
+
+    def __contains__(self, low):
+        index = bisect.bisect_right(self.starts, low) - 1
+        return index >= 0 and low <= self.ends[index]
+
+    def __iter__(self):
+        for start, end in zip(self.starts, self.ends):
+            yield from range(start, end + 1)
+
+    def add(self, low):
+        starts, ends = self.starts, self.ends
+        index = bisect.bisect_right(starts, low) - 1
+        if index >= 0 and low <= ends[index]:
+            return False
+        joins_previous = index >= 0 and ends[index] == low - 1
+        joins_next = index + 1 < len(starts) and starts[index + 1] == low + 1
+        if joins_previous and joins_next:
+            ends[index] = ends[index + 1]
+            del starts[index + 1], ends[index + 1]
+        elif joins_previous:
+            ends[index] = low
+        elif joins_next:
+            starts[index + 1] = low
+        else:
+            starts.insert(index + 1, low)
+            ends.insert(index + 1, low)
+        self.cardinality += 1
+        return True
+
+    def discard(self, low):
+        starts, ends = self.starts, self.ends
+        index = bisect.bisect_right(starts, low) - 1
+        if index < 0 or low > ends[index]:
+            return False
+        start, end = starts[index], ends[index]
+        if start == end:
+            del starts[index], ends[index]
+        elif low == start:
+            starts[index] = low + 1
+        elif low == end:
+            ends[index] = low - 1
+        else:
+            ends[index] = low - 1
+            starts.insert(index + 1, low + 1)
+            ends.insert(index + 1, end)
+        self.cardinality -= 1
+        return True
+
+    def count(self, first, last):
+        starts, ends = self.starts, self.ends
+        total = 0
+        index = max(bisect.bisect_right(starts, first) - 1, 0)
+        while index < len(starts) and starts[index] <= last:
+            total += max(0, min(ends[index], last) - max(starts[index], first) + 1)
+            index += 1
+        return total
+
+    def nbytes(self):
+        return 4 * len(self.starts)
+
+    def copy(self):
+        container = RunContainer()
+        container.starts = array('H', self.starts)
+        container.ends = array('H', self.ends)
+        container.cardinality = self.cardinality
+        return container
+
+    def payload(self):
+        pairs = array('H')
+        for start, end in zip(self.starts, self.ends):
+            pairs.append(start)
+            pairs.append(end - start)
+        return len(self.starts), _le(pairs)
+
+
+def _smallest(container):
+    """换成同样内容中最省空间的容器"""
+    runs = _runs(container)
+    if 4 * len(runs) < min(2 * len(container), BITMAP_BYTES):
+        best = RunContainer
+    elif len(container) <= ARRAY_MAX:
+        best = ArrayContainer
+    else:
+        best = BitmapContainer
+    return container if isinstance(container, best) else best(container)
+
+
+class ExploredSet:
+    """非负整数（区域编号）的压缩集合，用法与 set 类似：add、discard、in、len、有序遍历
+
+    count(first, last) 统计 [first, last] 中的元素数（按块 popcount，不逐个遍历）。
+    """
+
+    def __init__(self, values=()):
+        self._containers = {}  # {块号: 容器}
+        self._owned = set()  # 本集合独占（可以直接修改）的块号，其余块与副本共享
+        self._count = 0
+        self.update(values)
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, value):
+        container = self._containers.get(value >> 16)
+        return container is not None and (value & 0xFFFF) in container
+
+    def __iter__(self):
+        for key in sorted(self._containers):
+            base = key << 16
+            for low in self._containers[key]:
+                yield base + low
+
+    def __eq__(self, other):
+        if isinstance(other, ExploredSet):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"ExploredSet({len(self)} 个, {self.nbytes()} 字节)"
+
+    def _writable(self, key):
+        """取出可以修改的块（与副本共享时先复制）"""
+        container = self._containers.get(key)
+        if container is None:
+            container = self._containers[key] = ArrayContainer()
+            self._owned.add(key)
+        elif key not in self._owned:
+            container = self._containers[key] = container.copy()
+            self._owned.add(key)
+        return container
+
+    def add(self, value):
+        """加入 value，原来没有时返回 True"""
+        key = value >> 16
+        container = self._writable(key)
+        if not container.add(value & 0xFFFF):
+            return False
+        self._count += 1
+        size = len(container)
+        if container.kind == ArrayContainer.kind:
+            # 元素数每翻一番检查一次能否换成更省的容器（均摊 O(1)）
+            if size > ARRAY_MAX or (size >= 64 and size & (size - 1) == 0):
+                self._containers[key] = _smallest(container)
+        elif container.kind == RunContainer.kind and container.nbytes() > BITMAP_BYTES:
+            self._containers[key] = BitmapContainer(container)
+        return True
+
+    def discard(self, value):
+        """移除 value，原来有时返回 True"""
+        key = value >> 16
+        if key not in self._containers:
+            return False
+        container = self._writable(key)
+        if not container.discard(value & 0xFFFF):
+            return False
+        self._count -= 1
+        if not len(container):
+            del self._containers[key]
+            self._owned.discard(key)
+        return True
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def count(self, first=0, last=None):
+        """[first, last] 中的元素数"""
+        if last is None:
+            last = (max(self._containers, default=0) << 16) + 0xFFFF
+        total = 0
+        for key in range(first >> 16, (last >> 16) + 1):
+            container = self._containers.get(key)
+            if container is None:
+                continue
+            low = first & 0xFFFF if key == first >> 16 else 0
+            high = last & 0xFFFF if key == last >> 16 else 0xFFFF
+            total += len(container) if (low, high) == (0, 0xFFFF) else container.count(low, high)
+        return total
+
+    def copy(self):
+        """写时复制的副本：两边都只在修改某块时才复制该块"""
+        other = ExploredSet()
+        other._containers = dict(self._containers)
+        other._count = self._count
+        self._owned.clear()
+        return other
+
+    def optimize(self):
+        """把每块换成最省空间的容器"""
+        for key, container in self._containers.items():
+            best = _smallest(container)
+            if best is not container:
+                self._containers[key] = best
+                self._owned.add(key)
+
+    def nbytes(self):
+        """各块内容占用的字节数（不含 Python 对象本身的开销）"""
+        return sum(container.nbytes() for container in self._containers.values())
+
+    def container_kinds(self):
+        """{容器类名: 块数}"""
+        kinds = {}
+        for container in self._containers.values():
+            name = type(container).__name__
+            kinds[name] = kinds.get(name, 0) + 1
+        return kinds
+
+    def serialize(self):
+        parts = [_HEADER.pack(len(self._containers))]
+        for key in sorted(self._containers):
+            container = self._containers[key]
+            length, payload = container.payload()
+            parts.append(_BLOCK.pack(key, container.kind, length))
+            parts.append(payload)
+        return b''.join(parts)
+
+    @classmethod
+    def deserialize(cls, data, offset=0):
+        """返回 (集合, 新的偏移)；数据不完整或内容不合法（如损坏的文件）时抛出 ValueError"""
+        result = cls()
+        count, = _unpack(_HEADER, data, offset)
+        offset += _HEADER.size
+        previous_key = -1
+        for _ in range(count):
+            key, kind, length = _unpack(_BLOCK, data, offset)
+            offset += _BLOCK.size
+            if key <= previous_key:
+                raise ValueError(f"块号未按顺序排列：{key}")
+            previous_key = key
+            if kind == ArrayContainer.kind:
+                values = _from_le(_take(data, offset, 2 * length))
+                if length > BLOCK_SIZE or any(a >= b for a, b in zip(values, values[1:])):
+                    raise ValueError(f"块 {key} 的数组未按顺序排列")
+                container = ArrayContainer(values)
+                offset += 2 * length
+            elif kind == BitmapContainer.kind:
+                container = BitmapContainer()
+                container.bits[:] = _take(data, offset, BITMAP_BYTES)
+                if int.from_bytes(container.bits, 'little').bit_count() != length:
+                    raise ValueError(f"块 {key} 的位图元素数不符")
+                container.cardinality = length
+                offset += BITMAP_BYTES
+            elif kind == RunContainer.kind:
+                pairs = _from_le(_take(data, offset, 4 * length))
+                container = RunContainer()
+                container.starts = pairs[0::2]
+                ends = [start + extra for start, extra in zip(pairs[0::2], pairs[1::2])]
+                if any(end > 0xFFFF for end in ends) or any(
+                        start <= end for start, end in zip(container.starts[1:], ends)):
+                    raise ValueError(f"块 {key} 的连续段超出范围或重叠")
+                container.ends = array('H', ends)
+                container.cardinality = sum(pairs[1::2]) + length
+                offset += 4 * length
+            else:
+                raise ValueError(f"块 {key} 的容器种类未知：{kind}")
+            result._containers[key] = container
+            result._owned.add(key)
+            result._count += len(container)
+        return result, offset
+
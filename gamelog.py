@@ -0,0 +1,90 @@
+import html
+import logging
+import os
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from PySide6.QtCore import QTimer
+
+# 输出框最多保留的行数，更早的行只保存在日志文件中
+MAX_LOG_LINES = 2000
+# 日志文件默认位置、单个文件大小上限和保留的历史文件数
+LOG_PATH = os.path.join('logs', 'game.log')
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+
+class GameLog:
+    """游戏输出日志：输出框只保留最近的行，消息在每轮事件循环中批量写入，完整记录写入滚动日志文件"""
+
+    def __init__(self, view, max_lines=MAX_LOG_LINES, path=LOG_PATH,
+                 max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+        self.view = view  # QPlainTextEdit
+        self.view.setMaximumBlockCount(max_lines)
+        self.path = path
+        self.backup_count = backup_count
+        self._pending = []  # [(html, 纯文本)]
+        self._flush_scheduled = False
+
+        self._logger = None
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s', '%Y-%m-%d %H:%M:%S'))
+            self._logger = logging.getLogger(f'henan.gamelog.{id(self)}')
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            self._logger.addHandler(handler)
+
+    def append(self, text, prefix_html=''):
+        """追加一条消息（可含换行），实际写入推迟到本轮事件循环结束"""
+        body = html.escape(text).replace('\n', '<br>')
+        self._pending.append((prefix_html + body, text))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            QTimer.singleShot(0, self.flush)
+
+    def flush(self):
+        """把积压的消息一次性写入输出框和日志文件，并只滚动一次"""
+        self._flush_scheduled = False
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+
+        for message_html, _ in pending:
+            self.view.appendHtml(message_html)
+        scroll_bar = self.view.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
+
+        if self._logger is not None:
+            for _, text in pending:
+                for line in text.split('\n'):
+                    if line:
+                        self._logger.info(line)
+
+    def log_files(self):
+        """按从旧到新的顺序返回现有的日志文件"""
+        if not self.path:
+            return []
+        candidates = [f"{self.path}.{index}" for index in range(self.backup_count, 0, -1)] + [self.path]
+        return [path for path in candidates if os.path.exists(path)]
+
+    def search(self, keyword, limit=20):
+        """逐行扫描日志文件查找包含关键字的行，返回最近的 limit 条（不载入输出框）"""
+        self.flush()
+        matches = deque(maxlen=limit)
+        for path in self.log_files():
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if keyword in line:
+                        matches.append(line.rstrip('\n'))
+        return list(matches)
+
+    def close(self):
+        """写完积压的消息并关闭日志文件"""
+        self.flush()
+        if self._logger is not None:
+            for handler in list(self._logger.handlers):
+                handler.close()
+                self._logger.removeHandler(handler)
+            self._logger = None
@@ -1,18 +1,27 @@
 import sys
 from PySide6.QtWidgets import (QApplication, QMainWindow, QTextEdit, QPushButton,
-                               QVBoxLayout, QHBoxLayout, QWidget, QLabel, QGridLayout,
+                               QVBoxLayout, QHBoxLayout, QWidget, QLabel,
                                QFrame, QDialog, QMessageBox, QListWidget, QListWidgetItem,
-                               QInputDialog)
-from PySide6.QtCore import Qt
+                               QInputDialog, QScrollArea, QPlainTextEdit)
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QFont
+from mapwidget import MapWidget, MiniMapWidget
+from gamelog import GameLog
+from refresh import RefreshScheduler
+from engine import has_jinggai_suit, RESURRECT_COST
+from item import SHOP_ITEMS
+from battlesim import describe_prediction
 
 
 class EquipmentDialog(QDialog):
     """装备操作对话框"""
 
-    def __init__(self, player, parent=None):
+    def __init__(self, session, parent=None, profiler=None):
         super().__init__(parent)
-        self.player = player
+        self.session = session
+        self.player = session.player
+        if profiler is not None:
+            profiler.instrument(self, ['handle_equipment_click'])
         self.init_ui()
 
     def init_ui(self):
@@ -86,49 +95,19 @@ class EquipmentDialog(QDialog):
         self.weapon_display.setText(weapon if weapon else "无")
 
         # 井盖套装特效
-        if armor_count == 4 and all(
-                armor in self.player.equipped_armors
-                for armor in ["井盖面甲", "井盖肚兜", "井盖内裤", "井盖臭鞋"]
-        ):
+        if has_jinggai_suit(self.player):
             self.suit_effect.setText("✅ 井盖套装生效：血量+50% | 诅咒概率-50%")
         else:
             self.suit_effect.setText("")
 
     def handle_equipment_click(self, item):
         eq_name = item.data(Qt.UserRole)
-        eq_info = self.player.equipment[eq_name]
-
-        # 卸下装备
-        if (eq_info['type'] == 'armor' and eq_name in self.player.equipped_armors) or (
-                eq_info['type'] == 'weapon' and eq_name == self.player.equipped_weapon
-        ):
-            if eq_info['type'] == 'armor':
-                self.player.equipped_armors.remove(eq_name)
-                QMessageBox.information(self, "操作成功", f"已卸下甲胄：{eq_name}")
-            else:
-                self.player.equipped_weapon = None
-                QMessageBox.information(self, "操作成功", f"已卸下武器：{eq_name}")
-            self.parent().update_player_attributes()
-            self.update_backpack_list()
-            self.update_equipped_display()
-            return
-
-        # 装备物品
-        if eq_info['type'] == 'armor':
-            if len(self.player.equipped_armors) >= 4:
-                QMessageBox.warning(self, "装备失败", "甲胄最多只能装备4件！")
-                return
-            self.player.equipped_armors.append(eq_name)
-            QMessageBox.information(self, "操作成功", f"已装备甲胄：{eq_name}")
+        result = self.session.toggle_equipment(eq_name)
+        if result['ok']:
+            QMessageBox.information(self, result['title'], result['messages'][0])
         else:
-            if self.player.equipped_weapon is not None:
-                QMessageBox.warning(self, "装备失败", f"已装备武器：{self.player.equipped_weapon}，请先卸下！")
-                return
-            self.player.equipped_weapon = eq_name
-            if eq_name == "中之剑":
-                QMessageBox.information(self, "神器激活", "✅ 中之剑特效：所有操作前将输出「中！」")
-            else:
-                QMessageBox.information(self, "操作成功", f"已装备武器：{eq_name}")
+            QMessageBox.warning(self, result['title'], result['messages'][0])
+            return
 
         self.parent().update_player_attributes()
         self.update_backpack_list()
@@ -138,11 +117,13 @@ class EquipmentDialog(QDialog):
 class ShopDialog(QDialog):
     """井盖商店对话框"""
 
-    def __init__(self, player, item_system, parent=None):
+    def __init__(self, session, parent=None, profiler=None):
         super().__init__(parent)
-        self.player = player
-        self.item_system = item_system
+        self.session = session
+        self.player = session.player
         self.is_interactive = True
+        if profiler is not None:
+            profiler.instrument(self, ['buy_item'])
 
         self.init_ui()
 
@@ -160,15 +141,7 @@ class ShopDialog(QDialog):
         layout.addWidget(title)
 
         # 商品列表
-        self.shop_items = {
-            "胡辣汤": {"price": 5, "type": "consumable", "desc": "恢复生命值"},
-            "下水道口": {"price": 10, "type": "consumable", "desc": "立即回家"},
-            "井盖面甲": {"price": 200, "type": "equipment", "desc": "甲胄 | 血量+10 | 套装部件"},
-            "井盖肚兜": {"price": 350, "type": "equipment", "desc": "甲胄 | 血量+18 | 套装部件"},
-            "井盖内裤": {"price": 280, "type": "equipment", "desc": "甲胄 | 血量+15 | 套装部件"},
-            "井盖臭鞋": {"price": 200, "type": "equipment", "desc": "甲胄 | 血量+12 | 套装部件"},
-            "沾了胡辣汤的油条": {"price": 450, "type": "equipment", "desc": "武器 | 攻击+10 | 战斗胜利回满血量"}
-        }
+        self.shop_items = SHOP_ITEMS
 
         # 添加商品按钮
         for item_name, item_info in self.shop_items.items():
@@ -193,8 +166,8 @@ class ShopDialog(QDialog):
         self.setLayout(layout)
 
     def buy_item(self, item_name):
-        result = self.item_system.buy_item(item_name, self.shop_items)
-        QMessageBox.information(self, "购买结果", result)
+        result = self.session.buy(item_name)
+        QMessageBox.information(self, "购买结果", result['messages'][0])
         self.coins_label.setText(f"当前井盖数量: {self.player.gold}个")
         # 刷新按钮状态
         for i in range(self.layout().count()):
@@ -207,17 +180,77 @@ class ShopDialog(QDialog):
                 break
 
 
+class ProfilerOverlay(QLabel):
+    """浮在输出框上方的耗时统计（按 F12 显示/隐藏）"""
+
+    def __init__(self, profiler, parent):
+        super().__init__(parent)
+        self.profiler = profiler
+        self.setFont(QFont("Monospace", 9))
+        self.setStyleSheet("background-color: rgba(0, 0, 0, 180); color: #7CFC00; padding: 6px;")
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        if self.isVisible():
+            self.timer.stop()
+            self.hide()
+        else:
+            self.refresh()
+            self.show()
+            self.raise_()
+            self.timer.start(500)
+
+    def refresh(self):
+        self.setText("\n".join(self.profiler.summary_lines(limit=20)))
+        self.adjustSize()
+        self.move(10, 40)
+
+
 class GameWindow(QMainWindow):
     """游戏主窗口"""
 
-    def __init__(self, player, game_map, events, item_system):
+    # 启用耗时统计时计时的窗口处理函数（按钮、按键和刷新）与引擎操作；商店和装备对话框在创建时各自计时
+    PROFILED_HANDLERS = (
+        'confirm_name', 'move_player', 'explore_area', 'rest', 'show_items', 'show_character_info',
+        'open_shop', 'use_item', 'open_equipment', 'show_status', 'search_log',
+        'start_battle', 'battle_attack', 'battle_use_item', 'battle_flee', 'battle_auto',
+        'handle_key', 'description', 'update_map_display', 'refresh_player_cells', 'refresh_cells',
+        'append_text',
+    )
+    PROFILED_ACTIONS = (
+        'move', 'explore', 'fight', 'flee', 'attack', 'use_battle_item', 'auto_battle',
+        'resurrect', 'rest', 'use_item', 'describe', 'status', 'start', 'buy', 'toggle_equipment',
+    )
+
+    def __init__(self, session, profiler=None):
         super().__init__()
-        self.player = player
-        self.game_map = game_map
-        self.events = events
-        self.item_system = item_system
+        self.session = session  # 游戏逻辑全部由 GameSession 处理，窗口只负责显示
+        self.player = session.player
+        self.game_map = session.game_map
+        self.events = session.events
+        self.item_system = session.item_system
         self.is_interactive = True
+        # 耗时统计（profiler.ActionProfiler，默认不启用）：必须在按钮连接处理函数之前替换
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument(self, self.PROFILED_HANDLERS)
+            profiler.instrument(session, self.PROFILED_ACTIONS, prefix='session.')
+        # 游戏动作只标记需要刷新的部分，每轮事件循环统一刷新一次
+        self.scheduler = RefreshScheduler({
+            'map': self.update_map_display,
+            'player': self.refresh_player_cells,
+            'cells': self.refresh_cells,
+            'description': self.description,
+            'status': self.show_status,
+        }, supersedes={'map': ('player', 'cells')})
+        if profiler is not None:
+            # 一轮延迟刷新的总耗时
+            profiler.instrument(self.scheduler, ['flush'], prefix='refresh.')
         self.init_ui()
+        self.profiler_overlay = ProfilerOverlay(profiler, self) if profiler is not None else None
 
     def init_ui(self):
         self.setWindowTitle('河南冒险记')
@@ -239,19 +272,25 @@ class GameWindow(QMainWindow):
         content_layout = QHBoxLayout()
 
         # 输出区域
-        self.output_area = QTextEdit()
+        self.output_area = QPlainTextEdit()
         self.output_area.setReadOnly(True)
         self.output_area.setMinimumWidth(500)
-        self.output_area.setAcceptRichText(True)
+        self.log = GameLog(self.output_area)
         content_layout.addWidget(self.output_area)
 
         # 地图显示
-        map_frame = QFrame()
+        map_layout = QVBoxLayout()
+        map_frame = QScrollArea()
         map_frame.setFrameShape(QFrame.StyledPanel)
-        self.map_layout = QGridLayout(map_frame)
-        self.map_layout.setSpacing(5)
-        self.map_widgets = {}
-        content_layout.addWidget(map_frame)
+        map_frame.setAlignment(Qt.AlignCenter)
+        self.map_widget = MapWidget(self.game_map, self.player)
+        map_frame.setWidget(self.map_widget)
+        map_layout.addWidget(map_frame)
+
+        # 小地图（整个世界的缩略图）
+        self.minimap = MiniMapWidget(self.game_map, self.player, self.map_widget)
+        map_layout.addWidget(self.minimap, alignment=Qt.AlignCenter)
+        content_layout.addLayout(map_layout)
 
         main_layout.addLayout(content_layout)
 
@@ -299,7 +338,7 @@ class GameWindow(QMainWindow):
         self.rest_btn.clicked.connect(self.rest)
         self.items_btn.clicked.connect(self.show_items)
         self.status_btn.clicked.connect(self.show_character_info)
-        self.map_btn.clicked.connect(self.update_map_display)
+        self.map_btn.clicked.connect(lambda: self.scheduler.mark('map'))
         self.shop_btn.clicked.connect(self.open_shop)
 
         action_layout.addWidget(self.explore_btn)
@@ -315,14 +354,17 @@ class GameWindow(QMainWindow):
         self.attack_btn = QPushButton("攻击 (a)")
         self.item_btn = QPushButton("道具 (i)")
         self.flee_btn = QPushButton("逃跑 (f)")
+        self.auto_btn = QPushButton("自动战斗 (o)")
 
         self.attack_btn.clicked.connect(self.battle_attack)
         self.item_btn.clicked.connect(self.battle_use_item)
         self.flee_btn.clicked.connect(self.battle_flee)
+        self.auto_btn.clicked.connect(self.battle_auto)
 
         battle_layout.addWidget(self.attack_btn)
         battle_layout.addWidget(self.item_btn)
         battle_layout.addWidget(self.flee_btn)
+        battle_layout.addWidget(self.auto_btn)
         main_layout.addLayout(battle_layout)
 
         # 设置中心部件
@@ -339,6 +381,7 @@ class GameWindow(QMainWindow):
         self.attack_btn.setDisabled(disable)
         self.item_btn.setDisabled(disable)
         self.flee_btn.setDisabled(disable)
+        self.auto_btn.setDisabled(disable)
 
     def disable_game_buttons(self, disable):
         self.move_up_btn.setDisabled(disable)
@@ -352,73 +395,54 @@ class GameWindow(QMainWindow):
         self.map_btn.setDisabled(disable)
         self.shop_btn.setDisabled(disable)
 
-    def start_battle(self, monster):
+    def show_result(self, result):
+        """显示引擎操作返回的消息"""
+        for msg in result['messages']:
+            self.append_text(msg)
+
+    def start_battle(self):
+        result = self.session.fight()
         self.is_interactive = False
-        self.current_monster = monster
         self.disable_game_buttons(True)
         self.disable_battle_buttons(False)
-        self.append_text(f"\n进入战斗！对手是 {monster['name']} (HP: {monster['hp']})。")
+        self.show_result(result)
 
     def battle_attack(self):
-        result = self.events.battle_turn(self.current_monster)
-        self.current_monster['hp'] = result['monster_hp']
-        for msg in result['messages']:
-            self.append_text(msg)
-
-        if self.player.hp <= 0:
-            self.player.still_alive = False
-            self.end_battle(False)
-            return
-
+        result = self.session.attack()
+        self.show_result(result)
         if result['battle_over']:
-            self.end_battle(result['victory'])
-        else:
-            self.append_text(f"\n{self.current_monster['name']} 剩余生命值: {self.current_monster['hp']}")
-            self.append_text(f"你的剩余生命值: {self.player.hp}")
+            self.end_battle()
 
     def battle_use_item(self):
-        result = self.item_system.use_consumable('胡辣汤')
-        self.append_text(result)
-        if "恢复了" in result: # 判断是否使用成功
-            # 怪物回合
-            monster_damage = max(1, self.current_monster['attack'] - self.player.defense)
-            self.player.hp -= monster_damage
-            self.append_text(f"{self.current_monster['name']}对你造成{monster_damage}点伤害")
-            if self.player.hp <= 0:
-                self.player.still_alive = False
-                self.end_battle(False)
+        result = self.session.use_battle_item()
+        self.show_result(result)
+        if result['dead']:
+            self.end_battle()
+
+    def battle_auto(self):
+        """自动打完战斗，只显示摘要"""
+        self.show_result(self.session.auto_battle())
+        self.end_battle()
 
     def battle_flee(self):
-        self.player.hp -= 2
-        self.append_text(f"你选择了逃跑，损失了2点生命值。剩余生命值：{self.player.hp}")
-        if self.player.hp <= 0:
-            self.player.still_alive = False
-            self.append_text("你因伤势过重而倒下...")
-            self.end_battle(False)
-        else:
-            self.end_battle(False) # 逃跑算作非胜利
+        result = self.session.flee()
+        self.show_result(result)
+        self.end_battle()
 
-    def end_battle(self, victory):
+    def end_battle(self):
         self.is_interactive = True
         self.disable_battle_buttons(True)
 
-        if victory:
-            self.append_text("战斗胜利！")
-            self.disable_game_buttons(False)
-        elif not self.player.still_alive:
+        if self.session.state == 'dead':
             self.append_text("你被打败了...")
-            if self.player.gold >= 88:
+            if self.session.can_resurrect():
                 reply = QMessageBox.question(self, '复活',
-                                             "你拥有足够的井盖，是否花费88个井盖复活？",
+                                             f"你拥有足够的井盖，是否花费{RESURRECT_COST}个井盖复活？",
                                              QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
                 if reply == QMessageBox.Yes:
-                    self.player.gold -= 88
-                    self.player.hp = self.player.maxhp // 2
-                    self.player.still_alive = True
-                    self.append_text("你消耗了88个井盖，原地复活了！")
-                    self.show_status()
+                    self.show_result(self.session.resurrect())
+                    self.scheduler.mark('status')
                     self.disable_game_buttons(False)
-                    self.current_monster = None
                     return
 
             # If no resurrection
@@ -427,11 +451,8 @@ class GameWindow(QMainWindow):
             QMessageBox.information(self, "游戏结束", "你已经死亡，游戏结束。")
             self.close()
             return
-        else:  # Fleeing
-            self.append_text("你逃离了战斗。")
-            self.disable_game_buttons(False)
 
-        self.current_monster = None
+        self.disable_game_buttons(False)
 
     def disable_game_buttons(self, disable):
         self.move_up_btn.setDisabled(disable)
@@ -450,212 +471,130 @@ class GameWindow(QMainWindow):
         self.append_text("在这个游戏中，你将探索河南各地，收集井盖，与怪物战斗！")
         self.append_text("离老家越远，遇到的怪物可能越强大，但奖励也更丰厚！")
         self.append_text("特殊说明：输入名字「WEP」可激活管理员模式，直接获得所有装备！")
+        if self.session.started:
+            QTimer.singleShot(0, self.resume_game)
+            return
         self.append_text("请在下方输入框中输入你的名字，然后点击确认开始游戏。")
 
+    def resume_game(self):
+        """继续读取的存档：跳过名字输入，回到存档时的阶段"""
+        self.name_input.hide()
+        self.name_edit.hide()
+        self.confirm_name_btn.hide()
+        self.append_text(f"\n已读取存档，欢迎回来，{self.player.name}！")
+        self.scheduler.mark('description')
+        self.scheduler.mark('map')
+        self.session.start_prefetch()
+
+        state = self.session.state
+        if state == 'encounter':
+            self.handle_encounter(self.session.monster, self.session.predict())
+        elif state == 'battle':
+            self.is_interactive = False
+            self.disable_battle_buttons(False)
+        elif state == 'dead':
+            self.end_battle()
+        else:
+            self.disable_game_buttons(False)
+
     def confirm_name(self):
-        name = self.name_edit.toPlainText().strip()
-        if not name:
+        result = self.session.start(self.name_edit.toPlainText())
+        if not result['ok']:
             return
 
-        self.player.name = name
-        # 管理员模式
-        if name == "WEP":
-            self.append_text("\n【管理员模式激活】已自动获得所有装备！")
-            for eq_name in self.player.equipment.keys():
-                self.player.equipment[eq_name]['obtained'] = True
-            self.player.gold = 9999
-
         self.name_input.hide()
         self.name_edit.hide()
         self.confirm_name_btn.hide()
         self.disable_game_buttons(False)
+        self.show_result(result)
 
-        # 初始化属性
-        self.player.update_derived_attributes()
-
-        self.append_text(f"\n你的游戏主角名字叫 {self.player.name}。")
-        self.append_text(
-            f"初始属性: 生命值 {self.player.hp}/{self.player.maxhp}, 攻击力 {self.player.attack}, 防御力 {self.player.defense}")
-        self.append_text(f"你现在有 {self.player.gold} 个井盖，身上没有任何消耗品。")
-        if name == "WEP":
-            self.append_text("✅ 管理员福利：所有装备已解锁，可在「装备管理」中装备")
-        self.append_text(f"\n你的冒险开始于老家，去探索河南的更多地方吧...")
-
-        self.description()
-        self.update_map_display()
+        self.scheduler.mark('description')
+        self.scheduler.mark('map')
+        self.session.start_prefetch()
 
     def append_text(self, text):
         # 中之剑特效
         if self.player.equipped_weapon == "中之剑":
-            super_append = f'<span style="font-size:24px; color:#FF0000; font-weight:bold;">中！</span>\n{text}'
+            self.log.append(text, '<span style="font-size:24px; color:#FF0000; font-weight:bold;">中！</span><br>')
         else:
-            super_append = text
-        self.output_area.append(super_append)
-        self.output_area.verticalScrollBar().setValue(self.output_area.verticalScrollBar().maximum())
+            self.log.append(text)
 
-    def description(self):
-        current_area = self.game_map.get_area(self.player.locationID)
-        if not current_area:
-            self.append_text("警告：无效的位置信息")
+    def search_log(self):
+        """在日志文件中搜索关键字（包括已不在输出框中的旧消息）"""
+        keyword, ok = QInputDialog.getText(self, "搜索日志", "关键字:")
+        if not ok or not keyword:
             return
+        matches = self.log.search(keyword)
+        if matches:
+            self.append_text(f"日志中最近{len(matches)}条包含「{keyword}」的记录：\n" + "\n".join(matches))
+        else:
+            self.append_text(f"日志中没有包含「{keyword}」的记录")
 
-        is_explored = "已探索" if current_area["explored"] else "未探索"
-        self.append_text(f"\n当前位置: {current_area['type']}")
-        self.append_text(f"(X: {self.player.locationX}, Y: {self.player.locationY}) 该区域状态：{is_explored}")
-        self.append_text(f"距离老家: {current_area['distance_from_home']} 步")
-
-        if current_area['type'] == '老家':
-            self.append_text("你现在可以休息恢复生命值，也可以去井盖商店购物！")
-
-        # 装备状态
-        armor_count = len(self.player.equipped_armors)
-        weapon = self.player.equipped_weapon or "无"
-        self.append_text(f"当前装备：甲胄({armor_count}/4) | 武器：{weapon}")
-        if armor_count == 4 and all(
-                armor in self.player.equipped_armors
-                for armor in ["井盖面甲", "井盖肚兜", "井盖内裤", "井盖臭鞋"]
-        ):
-            self.append_text("✅ 井盖套装生效：血量+50% | 诅咒概率-50%")
+    def description(self):
+        self.show_result(self.session.describe())
 
     def update_player_attributes(self):
         """更新玩家属性（装备变更后调用）"""
         self.player.update_derived_attributes()
-        self.show_status()
+        self.scheduler.mark('status')
 
     def move_player(self, direction):
-        if not self.player.still_alive:
-            return
-
-        current_id = self.player.locationID
-        map_size = self.game_map.map_size
-        map_num = self.game_map.map_num
-
-        if direction == 'up':
-            if self.player.locationY - 1 >= 0:
-                self.player.locationY -= 1
-                self.player.locationID -= map_size
-            else:
-                self.player.locationY = map_size - 1
-                self.player.locationID = (self.player.locationID - map_size) + map_num
-        elif direction == 'down':
-            if self.player.locationY + 1 <= map_size - 1:
-                self.player.locationY += 1
-                self.player.locationID += map_size
-            else:
-                self.player.locationY = 0
-                self.player.locationID = (self.player.locationID + map_size) - map_num
-        elif direction == "left":
-            if self.player.locationX - 1 >= 0:
-                self.player.locationX -= 1
-                self.player.locationID -= 1
-            else:
-                self.player.locationX = map_size - 1
-                self.player.locationID += map_size - 1
-        elif direction == "right":
-            if self.player.locationX + 1 <= map_size - 1:
-                self.player.locationX += 1
-                self.player.locationID += 1
-            else:
-                self.player.locationX = 0
-                self.player.locationID -= map_size - 1
-
-        # 验证位置有效性
-        if self.player.locationID not in self.game_map.areas or self.player.locationID <= 0:
-            self.append_text(f"移动出错，已恢复原位置")
-            self.player.locationID = current_id
-            area = self.game_map.get_area(current_id)
-            self.player.locationX = area['x']
-            self.player.locationY = area['y']
-        else:
-            self.description()
-            self.update_map_display()
+        result = self.session.move(direction)
+        self.show_result(result)
+        if result['ok']:
+            self.scheduler.mark('description')
+            self.scheduler.mark('player')
 
     def update_map_display(self):
         """刷新地图显示"""
-        # 清空现有地图部件
-        for widget in self.map_widgets.values():
-            self.map_layout.removeWidget(widget)
-            widget.deleteLater()
-        self.map_widgets.clear()
-
-        # 重新创建地图单元格
-        for y in range(self.game_map.map_size):
-            for x in range(self.game_map.map_size):
-                area_id = y * self.game_map.map_size + x + 1
-                area = self.game_map.get_area(area_id)
-                if not area:
-                    continue
-
-                # 单元格样式
-                cell = QLabel(f"{area['type'][0]}\n{area_id}")
-                cell.setAlignment(Qt.AlignCenter)
-                cell.setMinimumSize(50, 50)
-                cell.setStyleSheet("border: 1px solid #ccc;")
-
-                # 玩家位置高亮
-                if area_id == self.player.locationID:
-                    cell.setStyleSheet("background-color: yellow; border: 2px solid red;")
-                # 老家标记
-                elif area_id == self.game_map.home_id:
-                    cell.setStyleSheet("background-color: green; color: white; border: 1px solid #ccc;")
-                # 已探索区域
-                elif area['explored']:
-                    cell.setStyleSheet("background-color: #eee; border: 1px solid #ccc;")
-
-                self.map_layout.addWidget(cell, y, x)
-                self.map_widgets[area_id] = cell
+        self.map_widget.refresh()
+        self.minimap.refresh()
+
+    def refresh_player_cells(self):
+        """只重绘玩家移动前后所在的单元格"""
+        self.map_widget.update_player()
+        self.minimap.update()
+
+    def refresh_cells(self, cells):
+        """只重绘指定的单元格（世界坐标集合）"""
+        for x, y in cells:
+            self.map_widget.update_area(x, y)
+        self.minimap.update()
 
     def explore_area(self):
-        if not self.player.still_alive:
+        result = self.session.explore()
+        if not result['ok']:
             return
-        result = self.events.explore_area(self.player.locationID)
 
-        if isinstance(result, dict) and result.get("type") == "battle":
-            monster = result["monster"]
-            reply = QMessageBox.question(self, '遭遇战斗', 
-                                       f"你遇到了 {monster['name']}！\n\n是否战斗？\n选择“否”将逃跑并损失5点生命值。",
-                                       QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        if result['monster'] is not None:
+            self.handle_encounter(result['monster'], result['prediction'])
+        self.show_result(result)
+        self.minimap.mark_explored(result['x'], result['y'])
 
-            if reply == QMessageBox.Yes:
-                self.start_battle(monster)
-            else:
-                self.player.hp -= 5
-                self.append_text(f"你选择了逃跑，损失了5点生命值。剩余生命值：{self.player.hp}")
-                if self.player.hp <= 0:
-                    self.player.still_alive = False
-                    self.append_text("你因伤势过重而倒下...")
-                    self.end_battle(False)
+        if result['expanded']:
+            self.scheduler.mark('map')
         else:
-            self.append_text(result)
+            self.scheduler.mark('cells', (result['x'], result['y']))
+
+    def handle_encounter(self, monster, prediction):
+        """遇到怪物时询问战斗还是逃跑"""
+        reply = QMessageBox.question(self, '遭遇战斗', 
+                                   f"你遇到了 {monster['name']}！\n{describe_prediction(prediction)}\n\n是否战斗？\n选择“否”将逃跑并损失5点生命值。",
+                                   QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
 
-        if self.game_map.check_all_explored():
-            self.append_text("\n恭喜你！已探索当前所有区域，地图正在扩展...")
-            self.game_map.expand_map()
-            self.update_map_display()
-            self.append_text("地图已扩展！新的区域等待你的探索！")
+        if reply == QMessageBox.Yes:
+            self.start_battle()
         else:
-            self.update_map_display()
+            flee = self.session.flee()
+            self.show_result(flee)
+            if flee['dead']:
+                self.end_battle()
 
     def rest(self):
-        if not self.player.still_alive:
-            return
-        current_area = self.game_map.get_area(self.player.locationID)
-        if current_area['type'] != '老家':
-            self.append_text("只有在老家才能休息恢复生命值")
-            return
-
-        healed = self.player.heal_hp()
-        self.append_text(f"在老家休息，恢复了{healed}点生命值！")
+        self.show_result(self.session.rest())
 
     def show_items(self):
-        if not self.player.items:
-            self.append_text("你的背包是空的")
-            return
-
-        item_list = []
-        for item, count in self.player.items.items():
-            item_list.append(f"{item}: {count}个")
-        self.append_text("背包物品：\n" + "\n".join(item_list))
+        self.show_result(self.session.items())
 
     def show_character_info(self):
         self.is_interactive = False
@@ -675,31 +614,24 @@ class GameWindow(QMainWindow):
         equip_button.clicked.connect(self.open_equipment)
         layout.addWidget(equip_button)
 
+        log_button = QPushButton("搜索日志")
+        log_button.clicked.connect(self.search_log)
+        layout.addWidget(log_button)
+
         dialog.setLayout(layout)
         dialog.exec_()
         self.is_interactive = True
 
     def show_status(self):
-        status = [
-            f"角色状态 - {self.player.name} Lv.{self.player.level}",
-            f"生命值: {self.player.hp}/{self.player.maxhp}",
-            f"攻击力: {self.player.attack} (基础+装备)",
-            f"防御力: {self.player.defense}",
-            f"井盖数量: {self.player.gold}",
-            f"经验值: {self.player.xp}/{self.player.xpForNextLevel}",
-            f"属性: 力量{self.player.strength} 敏捷{self.player.agility} "
-            f"活力{self.player.vitality} 运气{self.player.luck}"
-        ]
-        self.append_text("\n".join(status))
+        self.show_result(self.session.status())
 
     def open_shop(self):
-        current_area = self.game_map.get_area(self.player.locationID)
-        if current_area['type'] != '老家':
+        if not self.session.can_shop():
             self.append_text("只有在老家才能进入井盖商店")
             return
 
         self.is_interactive = False
-        shop_dialog = ShopDialog(self.player, self.item_system, self)
+        shop_dialog = ShopDialog(self.session, self, self.profiler)
         shop_dialog.exec_()
         self.is_interactive = True
 
@@ -710,7 +642,7 @@ class GameWindow(QMainWindow):
 
         self.is_interactive = False
         # 简单物品选择（实际项目可做更复杂的选择界面）
-        items = [name for name, count in self.player.items.items() if count > 0]
+        items = self.session.usable_items()
         if not items:
             QMessageBox.information(self, "提示", "没有可用的物品了。")
             self.is_interactive = True
@@ -718,12 +650,17 @@ class GameWindow(QMainWindow):
 
         item_name, ok = QInputDialog.getItem(self, "使用物品", "选择要使用的物品:", items, 0, False)
         if ok and item_name:
-            result = self.item_system.use_consumable(item_name)
-            self.append_text(result)
-            self.update_map_display()
+            self.show_result(self.session.use_item(item_name))
+            self.scheduler.mark('player')
         self.is_interactive = True
 
     def keyPressEvent(self, event):
+        if event.key() == Qt.Key_F12 and self.profiler_overlay is not None:
+            self.profiler_overlay.toggle()
+            return
+        self.handle_key(event)
+
+    def handle_key(self, event):
         if not self.is_interactive:
             return
 
@@ -740,6 +677,10 @@ class GameWindow(QMainWindow):
 
     def open_equipment(self):
         self.is_interactive = False
-        equip_dialog = EquipmentDialog(self.player, self)
+        equip_dialog = EquipmentDialog(self.session, self, self.profiler)
         equip_dialog.exec_()
         self.is_interactive = True
+
+    def closeEvent(self, event):
+        self.log.close()
+        super().closeEvent(event)
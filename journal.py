@@ -0,0 +1,151 @@
+"""操作日志：按顺序记录玩家的每个操作和本局的随机种子，可以不启动界面全速回放
+
+日志是只追加的文本文件，第一行为 "HNJ1 种子 地图尺寸"，之后每行一个操作：
+操作代码加上参数（如 "M u" 表示向上移动，"B 胡辣汤" 表示购买胡辣汤）。
+回放时用同样的种子和地图尺寸新建 GameSession 并依次执行这些操作，结果与原来的一局完全相同。
+
+用法：python journal.py 日志文件 [-v] [--repeat N]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+MAGIC = 'HNJ1'
+JOURNAL_DIR = 'logs'
+
+# 操作名 -> 日志中的代码
+ACTION_CODES = {
+    'start': 'S',
+    'move': 'M',
+    'explore': 'X',
+    'fight': 'F',
+    'flee': 'R',
+    'attack': 'A',
+    'use_battle_item': 'U',
+    'auto_battle': 'O',
+    'resurrect': 'Z',
+    'rest': 'H',
+    'use_item': 'I',
+    'buy': 'B',
+    'toggle_equipment': 'E',
+}
+CODE_ACTIONS = {code: action for action, code in ACTION_CODES.items()}
+DIRECTION_CODES = {'up': 'u', 'down': 'd', 'left': 'l', 'right': 'r'}
+CODE_DIRECTIONS = {code: direction for direction, code in DIRECTION_CODES.items()}
+ARG_TYPES = {'auto_battle': float}  # 其他操作的参数都是字符串
+
+
+def default_journal_path():
+    """每局游戏一个新文件：logs/journal-年月日-时分秒.jnl"""
+    return os.path.join(JOURNAL_DIR, time.strftime('journal-%Y%m%d-%H%M%S.jnl'))
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _unescape(text):
+    return re.sub(r'\\(.)', lambda match: '\n' if match.group(1) == 'n' else match.group(1), text)
+
+
+class ActionJournal:
+    """把 GameSession 的操作逐行追加写入文件（行缓冲，程序异常退出也不会丢失已完成的操作）"""
+
+    def __init__(self, path=None):
+        self.path = path or default_journal_path()
+        self.file = None
+        self.actions = 0
+
+    def begin(self, session):
+        """新建日志文件并写入本局的种子和初始地图尺寸"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.file = open(self.path, 'w', encoding='utf-8', buffering=1)
+        self.file.write(f"{MAGIC} {session.rng.seed} {session.game_map.map_size}\n")
+
+    def record(self, action, *args):
+        if self.file is None:
+            return
+        if action == 'move':
+            args = [DIRECTION_CODES[args[0]]]
+        line = ' '.join([ACTION_CODES[action]] + [_escape(str(arg)) for arg in args])
+        self.file.write(line + '\n')
+        self.actions += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def read_journal(path):
+    """读取日志，返回 {'seed', 'map_size', 'actions': [(操作名, 参数列表)]}"""
+    with open(path, encoding='utf-8') as f:
+        header = f.readline().split()
+        if len(header) != 3 or header[0] != MAGIC:
+            raise ValueError(f"{path} 不是操作日志文件")
+        actions = []
+        for line in f:
+            line = line.rstrip('\n')
+            if not line:
+                continue
+            code, _, arg = line.partition(' ')
+            action = CODE_ACTIONS[code]
+            if action == 'move':
+                args = [CODE_DIRECTIONS[arg]]
+            elif arg:
+                args = [ARG_TYPES.get(action, str)(_unescape(arg))]
+            else:
+                args = []
+            actions.append((action, args))
+    return {'seed': int(header[1]), 'map_size': int(header[2]), 'actions': actions}
+
+
+def replay(journal, output=None):
+    """不启动界面依次执行日志中的操作，返回回放后的会话和耗时
+
+    journal 为日志文件路径或 read_journal 的结果；output 不为 None 时把每条消息传给它。
+    'failed' 为回放时执行失败的操作数，正常情况下应为 0。
+    """
+    from engine import GameSession
+
+    if isinstance(journal, str):
+        journal = read_journal(journal)
+    session = GameSession(seed=journal['seed'], map_size=journal['map_size'])
+    failed = 0
+    start = time.perf_counter()
+    for action, args in journal['actions']:
+        result = getattr(session, action)(*args)
+        if not result['ok']:
+            failed += 1
+        if output is not None:
+            for msg in result['messages']:
+                output(msg)
+    seconds = time.perf_counter() - start
+    return {'session': session, 'actions': len(journal['actions']), 'failed': failed, 'seconds': seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回放操作日志")
+    parser.add_argument('path', help="操作日志文件")
+    parser.add_argument('-v', '--verbose', action='store_true', help="输出回放过程中的所有消息")
+    parser.add_argument('--repeat', type=int, default=1, help="重复回放次数（测量吞吐量）")
+    args = parser.parse_args()
+
+    journal = read_journal(args.path)
+    best = None
+    for index in range(args.repeat):
+        result = replay(journal, print if args.verbose and index == 0 else None)
+        best = result['seconds'] if best is None else min(best, result['seconds'])
+
+    session = result['session']
+    print(f"回放 {result['actions']} 个操作，失败 {result['failed']} 个，"
+          f"最短耗时 {best * 1000:.1f} ms（{result['actions'] / max(best, 1e-9):.0f} 操作/秒）")
+    print(f"最终状态：{session.state}，地图尺寸 {session.game_map.map_size}")
+    print(session.status()['messages'][0])
+    return 1 if result['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
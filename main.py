@@ -1,24 +1,95 @@
+import argparse
+import os
 import sys
-from PySide6.QtWidgets import QApplication
 from player import Player
 from map import GameMap
 from attack import ExplorationEvents
 from item import ItemSystem
-from gamewindow import GameWindow
+from engine import GameSession
+from rng import RandomStreams
+from journal import ActionJournal
+from savegame import SaveGame, load_game
+from profiler import ActionProfiler, PROFILE_PATH
 
-def main():
+SAVE_PATH = os.path.join('saves', 'autosave.sav')  # 默认存档位置
+
+
+def build_session(seed=None, journal=None):
     # 初始化游戏核心组件
+    rng = RandomStreams(seed)  # 各子系统独立的随机数流，相同种子得到相同的游戏
     player = Player()
-    game_map = GameMap(map_size=5)
-    item_system = ItemSystem(player)  # 初始化装备系统
+    game_map = GameMap(map_size=5, rng=rng)
+    item_system = ItemSystem(player, game_map)  # 初始化装备系统
     game_map.initialize(player)  # 初始化地图并设置老家
-    events = ExplorationEvents(player, game_map)  # 初始化探索事件
+    events = ExplorationEvents(player, game_map, rng)  # 初始化探索事件
+    # 游戏引擎（不依赖界面），玩家的每个操作都写入操作日志
+    return GameSession(player, game_map, events, item_system, journal=journal, prefetch=True)
+
+
+def run_gui(session, qt_args, profile_path=None):
+    # 只有启动图形界面时才导入 PySide6
+    from PySide6.QtWidgets import QApplication
+    from gamewindow import GameWindow
 
-    # 启动GUI
-    app = QApplication(sys.argv)
-    window = GameWindow(player, game_map, events, item_system)
+    app = QApplication([sys.argv[0]] + qt_args)
+    # 指定 profile_path 时统计每个处理函数的耗时，退出时写入该文件
+    profiler = ActionProfiler() if profile_path is not None else None
+    window = GameWindow(session, profiler)
     window.show()
-    sys.exit(app.exec())
+    try:
+        return app.exec()
+    finally:
+        if profiler is not None:
+            profiler.dump(profile_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="河南冒险记")
+    parser.add_argument('--tui', action='store_true', help="使用终端版界面")
+    parser.add_argument('--seed', type=int, help="随机种子（相同种子得到相同的世界和事件）")
+    parser.add_argument('--journal', help="操作日志文件（默认 logs/journal-时间.jnl，可用 journal.py 回放）")
+    parser.add_argument('--save', default=SAVE_PATH, help="存档文件，存在时自动继续上次的游戏（默认 saves/autosave.sav）")
+    parser.add_argument('--new', action='store_true', help="忽略已有存档，开始新游戏")
+    parser.add_argument('--profile', nargs='?', const=PROFILE_PATH, metavar='JSON',
+                        help="统计图形界面每个操作的耗时（F12 显示），退出时写入 JSON（默认 logs/latency.json）")
+    args, qt_args = parser.parse_known_args()
+
+    session = None
+    if not args.new and os.path.exists(args.save):
+        # 继续存档时世界和随机种子已经确定，读档后的操作也无法从新游戏开始回放
+        ignored = [flag for flag, value in (('--seed', args.seed), ('--journal', args.journal)) if value is not None]
+        if ignored:
+            parser.error(f"继续存档 {args.save} 时不能指定 {'、'.join(ignored)}，开始新游戏请加 --new")
+        try:
+            session = load_game(args.save, prefetch=True)
+        except (OSError, ValueError) as error:
+            # 存档损坏：保留原文件备查，开始新游戏
+            os.replace(args.save, args.save + '.bad')
+            print(f"无法读取存档（{error}），已改名为 {args.save}.bad，开始新游戏", file=sys.stderr)
+    if session is None:
+        journal = ActionJournal(args.journal)
+        session = build_session(args.seed, journal)
+    else:
+        journal = None  # 读档后不写操作日志
+    # 每个操作之后向存档追加增量
+    saver = SaveGame(session, args.save)
+    saver.attach()
+    try:
+        if args.tui:
+            # 终端版：不导入 PySide6
+            from tui import TerminalUI
+            TerminalUI(session).run()
+            status = 0
+        else:
+            status = run_gui(session, qt_args, args.profile)
+    finally:
+        if journal is not None:
+            journal.close()
+        if session.state == 'dead' or not session.started:
+            saver.discard()  # 游戏结束（或还没开始），下次启动开始新游戏
+        else:
+            saver.close()
+    sys.exit(status)
 
 if __name__ == "__main__":
     main()
@@ -1,96 +1,837 @@
+import math
+import mmap
+import os
 import random
+import re
+import struct
+import threading
+from array import array
+
+from explored import ExploredSet
+from rng import WORLD
+
+try:
+    import numpy as np
+except ImportError:  # 未安装 numpy 时退回逐格生成
+    np = None
+
+# 区块边长（每个区块包含 CHUNK_SIZE x CHUNK_SIZE 个区域）
+CHUNK_SIZE = 16
+_MASK64 = (1 << 64) - 1
+
+
+def spiral_id(x, y):
+    """世界坐标 -> 区域编号（老家为1，第 k 圈编号为 (2k-1)^2+1 到 (2k+1)^2）"""
+    k = max(abs(x), abs(y))
+    if k == 0:
+        return 1
+    side = 2 * k
+    if x == k and y > -k:
+        index = y + k - 1
+    elif y == k:
+        index = side + k - 1 - x
+    elif x == -k:
+        index = 2 * side + k - 1 - y
+    else:
+        index = 3 * side + x + k - 1
+    return (2 * k - 1) ** 2 + index + 1
+
+
+def spiral_coords(area_id):
+    """区域编号 -> 世界坐标"""
+    k = (math.isqrt(area_id - 1) + 1) // 2
+    if k == 0:
+        return 0, 0
+    side = 2 * k
+    edge, off = divmod(area_id - (2 * k - 1) ** 2 - 1, side)
+    if edge == 0:
+        return k, -k + 1 + off
+    if edge == 1:
+        return k - 1 - off, k
+    if edge == 2:
+        return -k, k - 1 - off
+    return -k + 1 + off, -k
+
+
+def seeded_type_index(seed, x, y, type_count):
+    """由 (种子, x, y) 哈希得到区域类型下标，同一种子下结果固定且与生成顺序无关"""
+    h = (seed * 0x9E3779B97F4A7C15
+         + (x & 0xFFFFFFFF) * 0xBF58476D1CE4E5B9
+         + (y & 0xFFFFFFFF) * 0x94D049BB133111EB) & _MASK64
+    # splitmix64 混合
+    h ^= h >> 30
+    h = (h * 0xBF58476D1CE4E5B9) & _MASK64
+    h ^= h >> 27
+    h = (h * 0x94D049BB133111EB) & _MASK64
+    h ^= h >> 31
+    return h % type_count
+
+
+def spiral_coord_arrays(first_id, last_id):
+    """区域编号 first_id..last_id 的世界坐标数组（spiral_coords 的向量化版本，需要 numpy）"""
+    ids = np.arange(first_id, last_id + 1, dtype=np.int64)
+    n = ids - 1
+    root = np.sqrt(n).astype(np.int64)
+    # 修正浮点开方的误差，得到精确的整数平方根
+    root -= root * root > n
+    root += (root + 1) * (root + 1) <= n
+    k = (root + 1) // 2
+    side = np.maximum(2 * k, 1)
+    edge, off = np.divmod(n - (2 * k - 1) ** 2, side)
+    xs = np.select([edge == 0, edge == 1, edge == 2], [k, k - 1 - off, -k], -k + 1 + off)
+    ys = np.select([edge == 0, edge == 1, edge == 2], [-k + 1 + off, k, k - 1 - off], -k)
+    xs[k == 0] = 0
+    ys[k == 0] = 0
+    return xs, ys
+
+
+def seeded_type_indices(seed, xs, ys, type_count):
+    """seeded_type_index 的向量化版本，结果与逐格计算完全一致"""
+    u64 = np.uint64
+    h = (u64((seed * 0x9E3779B97F4A7C15) & _MASK64)
+         + (xs & 0xFFFFFFFF).astype(u64) * u64(0xBF58476D1CE4E5B9)
+         + (ys & 0xFFFFFFFF).astype(u64) * u64(0x94D049BB133111EB))
+    h ^= h >> u64(30)
+    h *= u64(0xBF58476D1CE4E5B9)
+    h ^= h >> u64(27)
+    h *= u64(0x94D049BB133111EB)
+    h ^= h >> u64(31)
+    return (h % u64(type_count)).astype(np.int64)
+
+
+class MapChunk:
+    """固定大小的地图区块，按区块内偏移存放区域数据（每个区域一个字典）"""
+    __slots__ = ('cx', 'cy', 'cells')
+
+    def __init__(self, cx, cy, game_map=None):
+        self.cx = cx
+        self.cy = cy
+        self.cells = [None] * (CHUNK_SIZE * CHUNK_SIZE)
+
+    def get(self, offset):
+        return self.cells[offset]
+
+    def add(self, game_map, offset, x, y, area_type):
+        area = self.cells[offset] = game_map._create_area(x, y, area_type)
+        return area
+
+    def __iter__(self):
+        return (area for area in self.cells if area is not None)
+
+
+class CompactChunk:
+    """紧凑区块：区域类型存为 area_types 下标（bytearray），探索状态存为位图"""
+    __slots__ = ('cx', 'cy', 'types', 'explored', 'type_names', 'type_index')
+
+    def __init__(self, cx, cy, game_map):
+        self.cx = cx
+        self.cy = cy
+        # 0 表示该格尚未生成，其余为类型下标 + 1
+        self.types = bytearray(CHUNK_SIZE * CHUNK_SIZE)
+        self.explored = bytearray(CHUNK_SIZE * CHUNK_SIZE // 8)
+        self.type_names = game_map.type_names
+        self.type_index = game_map.type_index
+
+    def get(self, offset):
+        if not self.types[offset]:
+            return None
+        return AreaView(self, offset)
+
+    def add(self, game_map, offset, x, y, area_type):
+        self.types[offset] = self.type_index[area_type] + 1
+        return AreaView(self, offset)
+
+    def __iter__(self):
+        types = self.types
+        return (AreaView(self, offset) for offset in range(len(types)) if types[offset])
+
+    def coords(self, offset):
+        return self.cx * CHUNK_SIZE + offset % CHUNK_SIZE, self.cy * CHUNK_SIZE + offset // CHUNK_SIZE
+
+    def area_type(self, offset):
+        return self.type_names[self.types[offset] - 1]
+
+    def set_area_type(self, offset, area_type):
+        self.types[offset] = self.type_index[area_type] + 1
+
+    def is_explored(self, offset):
+        return bool(self.explored[offset >> 3] & (1 << (offset & 7)))
+
+    def set_explored(self, offset, value):
+        if value:
+            self.explored[offset >> 3] |= 1 << (offset & 7)
+        else:
+            self.explored[offset >> 3] &= ~(1 << (offset & 7)) & 0xFF
+
+
+class SeededChunk(CompactChunk):
+    """按需生成的区块：类型由种子和坐标即时算出，只保存被改写的类型，探索状态读写地图的 explored_ids"""
+    __slots__ = ('seed', 'overrides')
+
+    def __init__(self, cx, cy, game_map):
+        self.cx = cx
+        self.cy = cy
+        self.types = None
+        self.explored = game_map.explored_ids
+        self.type_names = game_map.type_names
+        self.type_index = game_map.type_index
+        self.seed = game_map.seed
+        self.overrides = {}  # {区块内偏移: 类型下标}
+
+    def get(self, offset):
+        return AreaView(self, offset)
+
+    def add(self, game_map, offset, x, y, area_type):
+        return AreaView(self, offset)
+
+    def area_type(self, offset):
+        index = self.overrides.get(offset)
+        if index is None:
+            x, y = self.coords(offset)
+            index = seeded_type_index(self.seed, x, y, len(self.type_names) - 1)
+        return self.type_names[index]
+
+    def set_area_type(self, offset, area_type):
+        self.overrides[offset] = self.type_index[area_type]
+
+    def is_explored(self, offset):
+        return spiral_id(*self.coords(offset)) in self.explored
+
+    def set_explored(self, offset, value):
+        if value:
+            self.explored.add(spiral_id(*self.coords(offset)))
+        else:
+            self.explored.discard(spiral_id(*self.coords(offset)))
+
+
+class MapFile:
+    """内存映射的地图文件：每个区域一条 1 字节的定长记录，按区域编号顺序存放
+
+    记录低 7 位为类型下标 + 1（0 表示未生成），最高位为探索标记。
+    区域编号按圈递增，扩展地图只会在文件末尾追加新一圈的记录，已有记录位置不变。
+    每距离的未探索计数保存在旁边的 .counts 文件中，已探索编号集合（ExploredSet）保存在 .explored 文件中，
+    重新打开时无需扫描全部记录；文件头的脏标记在首次改动时置位、flush 时清除，
+    未正常关闭的文件会重新扫描计数和探索标记。
+    """
+    MAGIC = b'HNMAP\x00\x00\x01'
+    HEADER = struct.Struct('<8sIIQBB')  # 标识, 尺寸, 已探索数, 种子, 是否有种子, 脏标记
+    DIRTY_OFFSET = HEADER.size - 1
+    HEADER_SIZE = 64
+    EXPLORED_BIT = 0x80
+    SCAN_CHUNK = 1 << 20  # 扫描探索标记时每次读取的记录数
+
+    def __init__(self, path, game_map):
+        self.path = path
+        self.type_names = game_map.type_names
+        self.type_index = game_map.type_index
+        exists = os.path.exists(path) and os.path.getsize(path) >= self.HEADER_SIZE
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        if not exists:
+            self.file.truncate(self.HEADER_SIZE)
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+        self.capacity = len(self.mm) - self.HEADER_SIZE
+
+        # 读取文件头（map_size 为 0 表示新文件）
+        magic, self.map_size, self.explored_count, seed, has_seed, dirty = self.HEADER.unpack_from(self.mm, 0)
+        if exists and magic != self.MAGIC:
+            raise ValueError(f"不是有效的地图文件：{path}")
+        self.seed = seed if has_seed else None
+        self.was_dirty = bool(dirty)
+        self.dirty = False
+
+    def _touch(self):
+        """首次改动记录前在文件头置脏标记"""
+        if not self.dirty:
+            self.dirty = True
+            self.mm[self.DIRTY_OFFSET] = 1
+
+    def reserve(self, count):
+        """确保文件能容纳 count 条记录（按 1.5 倍增长以减少重新映射）"""
+        if count <= self.capacity:
+            return
+        capacity = max(count, int(self.capacity * 1.5))
+        self.mm.close()
+        self.file.truncate(self.HEADER_SIZE + capacity)
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+        self.capacity = capacity
+
+    def get(self, index):
+        if index >= self.capacity or not self.mm[self.HEADER_SIZE + index] & 0x7F:
+            return None
+        return AreaView(self, index)
+
+    def write_types(self, first_index, type_codes):
+        """从 first_index 开始连续写入一段记录（type_codes 为类型下标 + 1 的字节数组）"""
+        self._touch()
+        start = self.HEADER_SIZE + first_index
+        self.mm[start:start + len(type_codes)] = type_codes
+
+    def add(self, index, area_type):
+        self._touch()
+        self.mm[self.HEADER_SIZE + index] = self.type_index[area_type] + 1
+        return AreaView(self, index)
+
+    def coords(self, index):
+        return spiral_coords(index + 1)
+
+    def area_type(self, index):
+        return self.type_names[(self.mm[self.HEADER_SIZE + index] & 0x7F) - 1]
+
+    def set_area_type(self, index, area_type):
+        self._touch()
+        pos = self.HEADER_SIZE + index
+        self.mm[pos] = (self.mm[pos] & self.EXPLORED_BIT) | (self.type_index[area_type] + 1)
+
+    def is_explored(self, index):
+        return bool(self.mm[self.HEADER_SIZE + index] & self.EXPLORED_BIT)
+
+    def set_explored(self, index, value):
+        self._touch()
+        pos = self.HEADER_SIZE + index
+        if value:
+            self.mm[pos] |= self.EXPLORED_BIT
+        else:
+            self.mm[pos] &= ~self.EXPLORED_BIT & 0xFF
+
+    def load_counts(self):
+        """读取每距离的未探索计数，上次未正常关闭或与文件头不一致时返回 None"""
+        if self.was_dirty:
+            return None
+        try:
+            with open(self.path + '.counts', 'rb') as f:
+                counts = array('I')
+                counts.frombytes(f.read())
+        except (OSError, ValueError):
+            return None
+        if len(counts) < 2 or counts[0] != self.map_size or counts[1] != self.explored_count:
+            return None
+        return {distance: count for distance, count in enumerate(counts[2:]) if count}
+
+    def load_explored(self):
+        """读取已探索编号集合，上次未正常关闭或与文件头不一致时返回 None"""
+        if self.was_dirty:
+            return None
+        try:
+            with open(self.path + '.explored', 'rb') as f:
+                explored, _ = ExploredSet.deserialize(f.read())
+        except (OSError, ValueError):
+            return None
+        if len(explored) != self.explored_count or explored.count(1, self.map_size ** 2) != len(explored):
+            return None
+        return explored
+
+    def scan_explored(self, count):
+        """逐段扫描前 count 条记录的探索标记（每次只复制 SCAN_CHUNK 条），返回已探索编号集合"""
+        explored = ExploredSet()
+        pattern = re.compile(rb'[\x80-\xff]')
+        for first in range(0, count, self.SCAN_CHUNK):
+            start = self.HEADER_SIZE + first
+            records = self.mm[start:start + min(self.SCAN_CHUNK, count - first)]
+            explored.update(first + match.start() + 1 for match in pattern.finditer(records))
+        return explored
+
+    def flush(self, game_map):
+        """写回文件头和计数文件，并把映射的脏页刷到磁盘"""
+        self.map_size = game_map.map_size
+        self.explored_count = game_map.explored_count
+        self.HEADER.pack_into(self.mm, 0, self.MAGIC, game_map.map_size, game_map.explored_count,
+                              game_map.seed or 0, game_map.seed is not None, 1)
+        self.mm.flush()
+
+        counts = array('I', [game_map.map_size, game_map.explored_count])
+        counts.extend(game_map.unexplored_by_distance.get(d, 0) for d in range(2 * game_map.radius + 1))
+        with open(self.path + '.counts', 'wb') as f:
+            f.write(counts.tobytes())
+        with open(self.path + '.explored', 'wb') as f:
+            f.write(game_map.explored_ids.serialize())
+
+        # 记录和计数都已落盘后再清除脏标记
+        self.mm[self.DIRTY_OFFSET] = 0
+        self.mm.flush()
+        self.dirty = False
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+
+class AreaView:
+    """紧凑存储中单个区域的轻量视图，用法与区域字典相同（area['type'] 等）"""
+    __slots__ = ('chunk', 'offset')
+
+    def __init__(self, chunk, offset):
+        self.chunk = chunk
+        self.offset = offset
+
+    @property
+    def x(self):
+        return self.chunk.coords(self.offset)[0]
+
+    @property
+    def y(self):
+        return self.chunk.coords(self.offset)[1]
+
+    def __getitem__(self, key):
+        chunk = self.chunk
+        offset = self.offset
+        if key == 'type':
+            return chunk.area_type(offset)
+        if key == 'explored':
+            return chunk.is_explored(offset)
+        if key == 'distance_from_home':
+            x, y = chunk.coords(offset)
+            return abs(x) + abs(y)
+        if key == 'x':
+            return self.x
+        if key == 'y':
+            return self.y
+        if key == 'mapID':
+            return spiral_id(*chunk.coords(offset))
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        chunk = self.chunk
+        offset = self.offset
+        if key == 'type':
+            chunk.set_area_type(offset, value)
+        elif key == 'explored':
+            chunk.set_explored(offset, value)
+        else:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        return isinstance(other, AreaView) and self.chunk is other.chunk and self.offset == other.offset
+
+    def __hash__(self):
+        return hash((id(self.chunk), self.offset))
+
+    def __repr__(self):
+        x, y = self.chunk.coords(self.offset)
+        return (f"AreaView(mapID={self['mapID']}, x={x}, y={y}, type={self['type']!r}, "
+                f"explored={self['explored']})")
 
 
 class GameMap:
-    def __init__(self, map_size=5):
+    def __init__(self, map_size=5, compact=False, seed=None, path=None, lookahead=2, rng=None):
+        # 地图以老家为中心，边长必须是奇数（2 * 半径 + 1），否则区域数与螺旋编号对不上
+        if map_size < 1 or map_size % 2 == 0:
+            raise ValueError(f"地图尺寸必须是正奇数：{map_size}")
         self.map_size = map_size
         self.map_num = map_size * map_size
-        self.areas = {}  # 区域数据 {area_id: area_data}
+        # 区块数据 {(chunk_x, chunk_y): MapChunk}，区域按以老家为原点的世界坐标存放
+        # compact=True 时改用 CompactChunk，每个区域约占 1 字节
+        # 指定 seed 后区域类型由 (seed, x, y) 决定，世界可复现；
+        # 同时 compact=True 时改用 SeededChunk，区域在读取时才生成，只保存探索状态等改动
+        # 指定 path 时区域保存在内存映射文件中（见 MapFile），不使用区块
+        # 只传入 rng（RandomStreams）时使用其 world 流的种子，后台预生成的先后顺序不影响生成结果
+        if seed is None and rng is not None:
+            seed = rng.seed_for(WORLD)
+        # 区域类型只取决于种子的低 64 位，统一换成无符号 64 位整数，地图文件和存档都按此保存
+        self.seed = seed & _MASK64 if seed is not None else None
+        self.generate_on_read = compact and seed is not None and path is None
+        self.chunks = {}
+        if self.generate_on_read:
+            self.chunk_class = SeededChunk
+        else:
+            self.chunk_class = CompactChunk if compact else MapChunk
         self.area_types = [
             "郑州", "洛阳", "开封", "安阳", "新乡",
             "焦作", "濮阳", "许昌", "漯河", "三门峡",
             "南阳", "商丘", "信阳", "周口", "驻马店",
             "平顶山", "鹤壁", "济源", "巩义", "兰考"
         ]
+        # 紧凑存储使用的类型表（老家作为额外的一种类型）
+        self.type_names = self.area_types + ['老家']
+        self.type_index = {name: index for index, name in enumerate(self.type_names)}
+        # 老家固定在世界坐标原点，区域编号按圈从老家向外螺旋递增，扩展地图不会改变已有编号
         self.home_x = 0
         self.home_y = 0
         self.home_id = 1
+        self.player = None
+
+        # 探索进度计数（随 mark_explored / expand_map 增量维护）
+        self.explored_count = 0
+        # 已探索的区域编号（压缩集合，见 explored.ExploredSet），可按编号区间计数
+        self.explored_ids = ExploredSet()
+        self.areas_by_distance = {}  # {distance_from_home: 区域数}
+        self.unexplored_by_distance = {}  # {distance_from_home: 未探索区域数}
+
+        self._np_rng = None
+        # 不为 None 时 mark_explored 把新探索的区域编号追加到这个列表（供增量存档使用）
+        self.explored_log = None
+
+        # 预生成的外圈数据 {圈号: 批次}，lookahead 为默认提前生成的圈数
+        self.lookahead = lookahead
+        self._prefetched = {}
+        self._prefetch_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._prefetch_thread = None
+
+        self.map_file = None
+        if path is not None:
+            self._open_map_file(path)
+
+    def _open_map_file(self, path):
+        """打开内存映射地图文件，文件中已有世界时直接沿用其尺寸、种子和计数"""
+        self.map_file = MapFile(path, self)
+        if not self.map_file.map_size:
+            return
+        self.map_size = self.map_file.map_size
+        self.map_num = self.map_size * self.map_size
+        self.seed = self.map_file.seed
+        self.explored_count = self.map_file.explored_count
+        explored = self.map_file.load_explored()
+        if explored is None:
+            # 已探索集合文件缺失或过期，逐段扫描记录重建
+            explored = self.map_file.scan_explored(self.map_num)
+        self.explored_ids = explored
+        self.areas_by_distance = self._distance_counts(0, self.radius)
+
+        counts = self.map_file.load_counts()
+        if counts is None:
+            # 计数文件缺失或过期，扫描一遍记录重建
+            self.explored_count = 0
+            counts = {}
+            for area_id in range(1, self.map_num + 1):
+                area = self.map_file.get(area_id - 1)
+                if area['explored']:
+                    self.explored_count += 1
+                else:
+                    distance = area['distance_from_home']
+                    counts[distance] = counts.get(distance, 0) + 1
+        self.unexplored_by_distance = counts
+
+    @property
+    def radius(self):
+        """地图半径（老家到边缘的格数）"""
+        return self.map_size // 2
 
     def initialize(self, player):
         """初始化地图并设置老家位置"""
-        center = (self.map_size - 1) // 2
-        self.home_x = center
-        self.home_y = center
-        self.home_id = center * self.map_size + center + 1
+        self.player = player
+        if self.map_file is not None and self.map_file.map_size:
+            # 重新打开已有的地图文件，不再生成区域
+            player.exploredAreas = self.explored_count
+            player.move_to_home(self.home_x, self.home_y, self.home_id)
+            return
 
-        # 创建地图区域
-        for y in range(self.map_size):
-            for x in range(self.map_size):
-                area_id = y * self.map_size + x + 1
-                self.areas[area_id] = self._create_area(area_id, x, y)
+        # 创建地图区域（老家位于世界坐标原点）
+        self._commit_rings(self._build_rings(0, self.radius))
 
         # 标记老家
-        self.areas[self.home_id]['type'] = '老家'
-        self.areas[self.home_id]['explored'] = True
+        self._get_cell(0, 0, create=True)['type'] = '老家'
+        self.mark_explored(self.home_id)
         player.move_to_home(self.home_x, self.home_y, self.home_id)
+        self.flush()
+
+    def restore(self, player, explored_ids, types=None):
+        """按存档恢复地图内容：types 为按区域编号排列的类型下标（None 时按种子重新生成），
+        explored_ids 为已探索的区域编号"""
+        self.player = player
+        self._commit_rings(self._build_rings(0, self.radius, types))
+        if types is None:
+            self._get_cell(0, 0, create=True)['type'] = '老家'
+        for area_id in explored_ids:
+            self.mark_explored(area_id)
+        self.flush()
+
+    def export_types(self, first_id=1, last_id=None):
+        """编号 first_id..last_id 的区域类型下标（type_names 中的位置），按编号排列"""
+        last_id = self.map_num if last_id is None else last_id
+        type_index = self.type_index
+        return bytes(type_index[self.get_area(area_id)['type']] for area_id in range(first_id, last_id + 1))
+
+    def export_explored(self):
+        """已探索区域编号的写时复制副本（ExploredSet），之后继续探索不影响副本"""
+        return self.explored_ids.copy()
 
-    def _create_area(self, area_id, x, y):
-        """创建单个区域数据"""
+    def count_explored(self, first_id=1, last_id=None):
+        """编号 first_id..last_id 中已探索的区域数（如某一圈：count_explored((2k-1)²+1, (2k+1)²)）"""
+        return self.explored_ids.count(first_id, self.map_num if last_id is None else last_id)
+
+    def _new_area_type(self, x, y):
+        """为新区域选择类型（指定种子时由坐标哈希决定）"""
+        if self.seed is None:
+            return random.choice(self.area_types)
+        return self.area_types[seeded_type_index(self.seed, x, y, len(self.area_types))]
+
+    def _create_area(self, x, y, area_type):
+        """创建单个区域数据（x, y 为以老家为原点的世界坐标）"""
         return {
-            'mapID': area_id,
+            'mapID': self.get_area_id(x, y),
             'x': x,
             'y': y,
-            'type': random.choice(self.area_types),
+            'type': area_type,
             'explored': False,
             'distance_from_home': self.calculate_distance(x, y)
         }
 
+    def _get_cell(self, x, y, create=False):
+        """按世界坐标读取区域，区块不存在时返回 None（读取时生成模式下按需创建区块）"""
+        if self.map_file is not None:
+            return self.map_file.get(spiral_id(x, y) - 1)
+        key = (x // CHUNK_SIZE, y // CHUNK_SIZE)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            if not (create or self.generate_on_read):
+                return None
+            chunk = self.chunks[key] = self.chunk_class(key[0], key[1], self)
+        return chunk.get((y % CHUNK_SIZE) * CHUNK_SIZE + x % CHUNK_SIZE)
+
+    def _place_area(self, x, y, area_type):
+        """在世界坐标处写入新区域（按需创建区块）"""
+        if self.map_file is not None:
+            self.map_file.add(spiral_id(x, y) - 1, area_type)
+            return
+        key = (x // CHUNK_SIZE, y // CHUNK_SIZE)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = self.chunk_class(key[0], key[1], self)
+        chunk.add(self, (y % CHUNK_SIZE) * CHUNK_SIZE + x % CHUNK_SIZE, x, y, area_type)
+
+    @staticmethod
+    def _distance_counts(first, last):
+        """第 first..last 圈上各距离的区域数（按距离逐个用闭式计算，与圈数成正比而不是与区域数成正比）
+
+        半径 r 的地图（第 0..r 圈）中距离 0 有 1 格，1 ≤ d ≤ r 有 4d 格，r < d ≤ 2r 有 4(2r - d + 1) 格，
+        第 first..last 圈即半径 last 的地图减去半径 first - 1 的地图。
+        """
+        def square(radius, d):
+            if radius < 0 or d > 2 * radius:
+                return 0
+            if d == 0:
+                return 1
+            return 4 * d if d <= radius else 4 * (2 * radius - d + 1)
+
+        return {d: square(last, d) - square(first - 1, d) for d in range(first, 2 * last + 1)}
+
+    def _build_rings(self, first, last, types=None):
+        """生成第 first..last 圈的区域数据但不写入地图，返回交给 _commit_rings 的批次
+
+        不修改地图状态，可以在后台线程中调用；有 numpy 时整批一次性生成。
+        types 为按区域编号排列的类型下标（type_names 中的位置）时使用这些类型而不随机生成（读取存档）。
+        """
+        batch = {'first': first, 'last': last, 'counts': self._distance_counts(first, last),
+                 'cells': None, 'dicts': None, 'chunks': None, 'codes': None}
+        # 读取时生成：不创建任何区域，只按圈的几何形状更新计数
+        if self.generate_on_read:
+            return batch
+
+        with self._build_lock:
+            if np is None:
+                coords = [(x, y) for k in range(first, last + 1) for x, y in self._ring_coords(k)]
+                if types is None:
+                    batch['cells'] = [(x, y, self._new_area_type(x, y)) for x, y in coords]
+                else:
+                    batch['cells'] = [(x, y, self.type_names[index]) for (x, y), index in zip(coords, types)]
+                return batch
+
+            # 这几圈的区域编号是连续的一段
+            first_id = (2 * first - 1) ** 2 + 1 if first > 0 else 1
+            last_id = (2 * last + 1) ** 2
+            xs, ys = spiral_coord_arrays(first_id, last_id)
+            if types is not None:
+                types = np.frombuffer(bytes(types), dtype=np.uint8).astype(np.int64)
+            elif self.seed is None:
+                if self._np_rng is None:
+                    self._np_rng = np.random.default_rng()
+                types = self._np_rng.integers(0, len(self.area_types), size=len(xs))
+            else:
+                types = seeded_type_indices(self.seed, xs, ys, len(self.area_types))
+
+        if self.map_file is not None:
+            batch['codes'] = (types + 1).astype(np.uint8).tobytes()
+        elif self.chunk_class is MapChunk:
+            batch['dicts'] = self._build_area_dicts(first_id, xs, ys, types)
+        else:
+            batch['chunks'] = self._group_by_chunk(xs, ys, types)
+        return batch
+
+    def _build_area_dicts(self, first_id, xs, ys, types):
+        """把批量生成的结果做成区域字典，返回 [(区块坐标, 区块内偏移, 区域字典)]"""
+        names = self.type_names
+        distances = np.abs(xs) + np.abs(ys)
+        return [((x // CHUNK_SIZE, y // CHUNK_SIZE), (y % CHUNK_SIZE) * CHUNK_SIZE + x % CHUNK_SIZE, {
+            'mapID': area_id,
+            'x': x,
+            'y': y,
+            'type': names[type_index],
+            'explored': False,
+            'distance_from_home': distance
+        }) for area_id, x, y, type_index, distance in zip(
+            range(first_id, first_id + len(xs)), xs.tolist(), ys.tolist(), types.tolist(), distances.tolist())]
+
+    def _group_by_chunk(self, xs, ys, types):
+        """按区块分组批量生成的类型下标，返回 [(区块坐标, 偏移数组, 类型码数组)]"""
+        cxs = xs // CHUNK_SIZE
+        cys = ys // CHUNK_SIZE
+        offsets = (ys % CHUNK_SIZE) * CHUNK_SIZE + xs % CHUNK_SIZE
+        codes = (types + 1).astype(np.uint8)
+        order = np.lexsort((cys, cxs))
+        cxs, cys, offsets, codes = cxs[order], cys[order], offsets[order], codes[order]
+        bounds = np.flatnonzero((np.diff(cxs) != 0) | (np.diff(cys) != 0)) + 1
+        return [((int(cxs[start]), int(cys[start])), offsets[start:end], codes[start:end])
+                for start, end in zip([0] + bounds.tolist(), bounds.tolist() + [len(order)])]
+
+    def _commit_rings(self, batch):
+        """把 _build_rings 生成的批次写入地图并更新计数（新区域都未探索）"""
+        first, last = batch['first'], batch['last']
+        if self.map_file is not None:
+            self.map_file.reserve((2 * last + 1) ** 2)
+
+        chunks = self.chunks
+        if batch['codes'] is not None:
+            self.map_file.write_types((2 * first - 1) ** 2 if first > 0 else 0, batch['codes'])
+        elif batch['dicts'] is not None:
+            for key, offset, area in batch['dicts']:
+                chunk = chunks.get(key)
+                if chunk is None:
+                    chunk = chunks[key] = MapChunk(key[0], key[1])
+                chunk.cells[offset] = area
+        elif batch['chunks'] is not None:
+            for key, offsets, codes in batch['chunks']:
+                chunk = chunks.get(key)
+                if chunk is None:
+                    chunk = chunks[key] = self.chunk_class(key[0], key[1], self)
+                np.frombuffer(chunk.types, dtype=np.uint8)[offsets] = codes
+        elif batch['cells'] is not None:
+            for x, y, area_type in batch['cells']:
+                self._place_area(x, y, area_type)
+
+        for distance, count in batch['counts'].items():
+            self.areas_by_distance[distance] = self.areas_by_distance.get(distance, 0) + count
+            self.unexplored_by_distance[distance] = self.unexplored_by_distance.get(distance, 0) + count
+
+    def prefetch(self, depth=None):
+        """提前生成当前地图之外 depth 圈（默认 lookahead）的数据，之后扩展地图时直接写入"""
+        depth = self.lookahead if depth is None else depth
+        if self.generate_on_read:
+            return
+        for k in range(self.radius + 1, self.radius + depth + 1):
+            with self._prefetch_lock:
+                if k in self._prefetched or k <= self.radius:
+                    continue
+            batch = self._build_rings(k, k)
+            with self._prefetch_lock:
+                if k > self.radius:
+                    self._prefetched[k] = batch
+
+    def start_prefetch(self, depth=None):
+        """在后台线程中执行 prefetch，已有预生成线程在运行时不重复启动"""
+        if self.generate_on_read or (self._prefetch_thread is not None and self._prefetch_thread.is_alive()):
+            return
+        self._prefetch_thread = threading.Thread(target=self.prefetch, args=(depth,), daemon=True)
+        self._prefetch_thread.start()
+
+    def _ring_coords(self, k):
+        """按顺时针顺序生成第 k 圈（切比雪夫距离为 k）的世界坐标"""
+        if k == 0:
+            yield 0, 0
+            return
+        side = 2 * k
+        for off in range(side):
+            yield k, -k + 1 + off
+        for off in range(side):
+            yield k - 1 - off, k
+        for off in range(side):
+            yield -k, k - 1 - off
+        for off in range(side):
+            yield -k + 1 + off, -k
+
+    def get_area_id(self, x, y):
+        """世界坐标 -> 区域编号"""
+        return spiral_id(x, y)
+
+    def get_coords(self, area_id):
+        """区域编号 -> 世界坐标"""
+        return spiral_coords(area_id)
+
+    def get_area_at(self, x, y):
+        """按世界坐标获取区域数据，超出当前地图范围返回 None"""
+        radius = self.radius
+        if abs(x) > radius or abs(y) > radius:
+            return None
+        return self._get_cell(x, y)
+
+    def iter_areas(self):
+        """遍历所有已生成的区域"""
+        if self.generate_on_read or self.map_file is not None:
+            for k in range(self.radius + 1):
+                for x, y in self._ring_coords(k):
+                    yield self._get_cell(x, y)
+            return
+        for chunk in self.chunks.values():
+            yield from chunk
+
     def calculate_distance(self, x, y):
         """计算与老家的曼哈顿距离"""
         return abs(x - self.home_x) + abs(y - self.home_y)
 
     def get_area(self, area_id):
         """获取区域数据"""
-        return self.areas.get(area_id)
+        if not 1 <= area_id <= self.map_num:
+            return None
+        return self._get_cell(*self.get_coords(area_id))
 
     def mark_explored(self, area_id):
-        """标记区域为已探索"""
-        if area_id in self.areas:
-            self.areas[area_id]['explored'] = True
+        """标记区域为已探索，首次探索时返回 True"""
+        area = self.get_area(area_id)
+        if area is None or area['explored']:
+            return False
+
+        area['explored'] = True
+        self.explored_ids.add(area_id)
+        self.explored_count += 1
+        self.unexplored_by_distance[area['distance_from_home']] -= 1
+        if self.player is not None:
+            self.player.exploredAreas = self.explored_count
+        if self.explored_log is not None:
+            self.explored_log.append(area_id)
+        return True
 
     def check_all_explored(self):
         """检查是否所有区域都已探索"""
-        return all(area['explored'] for area in self.areas.values())
-
-    def expand_map(self):
-        """扩展地图"""
-        new_size = self.map_size + 2
-        new_areas = {}
-
-        # 将老家坐标平移
-        self.home_x += 1
-        self.home_y += 1
-
-        # 创建新的扩展地图
-        for y in range(new_size):
-            for x in range(new_size):
-                area_id = y * new_size + x + 1
-                # 内部旧地图区域
-                if 1 <= x < new_size - 1 and 1 <= y < new_size - 1:
-                    old_x = x - 1
-                    old_y = y - 1
-                    old_area_id = old_y * self.map_size + old_x + 1
-                    area_data = self.areas[old_area_id]
-                    area_data['x'] = x
-                    area_data['y'] = y
-                    area_data['mapID'] = area_id
-                    area_data['distance_from_home'] = self.calculate_distance(x, y)
-                    new_areas[area_id] = area_data
-                # 新增的外部区域
-                else:
-                    new_areas[area_id] = self._create_area(area_id, x, y)
+        return self.explored_count == self.map_num
+
+    def unexplored_at_distance(self, distance):
+        """距离老家 distance 步的区域中还有多少未探索"""
+        return self.unexplored_by_distance.get(distance, 0)
+
+    def expand_map(self, rings=1):
+        """扩展地图（只生成新增的外圈区域，已有区域的坐标和编号保持不变），一次可扩展多圈"""
+        radius = self.radius
+        # 优先使用已预生成的圈，剩下的一次性生成
+        batches = []
+        with self._prefetch_lock:
+            while len(batches) < rings and radius + len(batches) + 1 in self._prefetched:
+                batches.append(self._prefetched.pop(radius + len(batches) + 1))
+        if len(batches) < rings:
+            batches.append(self._build_rings(radius + len(batches) + 1, radius + rings))
+        for batch in batches:
+            self._commit_rings(batch)
+
+        with self._prefetch_lock:
+            self.map_size += 2 * rings
+            # 丢弃扩展期间后台线程才放入的、已经用不到的圈
+            for k in [k for k in self._prefetched if k <= self.radius]:
+                del self._prefetched[k]
+        self.map_num = self.map_size * self.map_size
+        self.flush()
+
+    def flush(self):
+        """把内存映射地图文件的改动写回磁盘（其他存储方式下无操作）"""
+        if self.map_file is not None:
+            self.map_file.flush(self)
 
-        self.map_size = new_size
-        self.map_num = new_size * new_size
-        self.areas = new_areas
-        self.home_id = self.home_y * self.map_size + self.home_x + 1
+    def close(self):
+        """保存并关闭内存映射地图文件"""
+        if self.map_file is not None:
+            self.map_file.flush(self)
+            self.map_file.close()
+            self.map_file = None
@@ -0,0 +1,185 @@
+from PySide6.QtWidgets import QWidget
+from PySide6.QtCore import Qt, QRect, QSize, QPoint
+from PySide6.QtGui import QPainter, QColor, QPen, QImage
+
+# 单元格尺寸与间距（与原先的 QLabel 网格一致）
+CELL_SIZE = 50
+CELL_SPACING = 5
+# 地图超过 (2 * VIEWPORT_RADIUS + 1) 格宽时自动切换为以玩家为中心的视野模式
+VIEWPORT_RADIUS = 5
+# 小地图尺寸（像素）
+MINIMAP_SIZE = 200
+
+
+class MapWidget(QWidget):
+    """自绘地图：直接从 GameMap 读取数据绘制，只重绘发生变化的单元格
+
+    视野模式下只显示以玩家为中心的 (2 * viewport_radius + 1) 格见方的窗口，
+    绘制开销只与窗口大小有关，与世界大小无关。
+    """
+
+    def __init__(self, game_map, player, parent=None, viewport_radius=VIEWPORT_RADIUS, auto_viewport=True):
+        super().__init__(parent)
+        self.game_map = game_map
+        self.player = player
+        self.viewport_radius = viewport_radius
+        self.auto_viewport = auto_viewport  # 为 False 时始终使用视野模式
+        self.viewport = False
+        self._player_cell = (player.locationX, player.locationY)  # 上次绘制时玩家所在的世界坐标
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.refresh()
+
+    def _span(self):
+        """每边显示的格数"""
+        return 2 * self.viewport_radius + 1 if self.viewport else self.game_map.map_size
+
+    def _origin(self):
+        """左上角单元格的世界坐标"""
+        if self.viewport:
+            x, y = self._player_cell
+            return x - self.viewport_radius, y - self.viewport_radius
+        return -self.game_map.radius, -self.game_map.radius
+
+    def sizeHint(self):
+        side = self._span() * (CELL_SIZE + CELL_SPACING) - CELL_SPACING
+        return QSize(side, side)
+
+    def cell_rect(self, x, y):
+        """世界坐标对应的单元格矩形"""
+        pitch = CELL_SIZE + CELL_SPACING
+        left, top = self._origin()
+        return QRect((x - left) * pitch, (y - top) * pitch, CELL_SIZE, CELL_SIZE)
+
+    def refresh(self):
+        """整张地图重绘（地图尺寸变化时调用）"""
+        self.viewport = not self.auto_viewport or self.game_map.map_size > 2 * self.viewport_radius + 1
+        self.setFixedSize(self.sizeHint())
+        self._player_cell = (self.player.locationX, self.player.locationY)
+        self.update()
+
+    def update_area(self, x, y):
+        """只重绘一个单元格（如刚探索的区域）"""
+        self.update(self.cell_rect(x, y))
+
+    def update_player(self):
+        """玩家移动后重绘旧位置和新位置两个单元格（视野模式下整个视野随玩家滚动）"""
+        old_x, old_y = self._player_cell
+        self._player_cell = (self.player.locationX, self.player.locationY)
+        if self.viewport:
+            self.update()
+            return
+        self.update_area(old_x, old_y)
+        self.update_area(*self._player_cell)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        dirty = event.rect()
+        painter.fillRect(dirty, self.palette().window())
+
+        # 只遍历与重绘区域相交的单元格
+        pitch = CELL_SIZE + CELL_SPACING
+        last = self._span() - 1
+        left, top = self._origin()
+        first_col = max(0, dirty.left() // pitch)
+        last_col = min(last, dirty.right() // pitch)
+        first_row = max(0, dirty.top() // pitch)
+        last_row = min(last, dirty.bottom() // pitch)
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                x, y = left + col, top + row
+                area = self.game_map.get_area_at(x, y)
+                if area:
+                    self._draw_cell(painter, self.cell_rect(x, y), area)
+        painter.end()
+
+    def _draw_cell(self, painter, rect, area):
+        """按区域状态绘制单个单元格"""
+        area_id = area['mapID']
+        text_color = QColor('black')
+        border = QPen(QColor('#ccc'), 1)
+        # 玩家位置高亮
+        if area_id == self.player.locationID:
+            background = QColor('yellow')
+            border = QPen(QColor('red'), 2)
+        # 老家标记
+        elif area_id == self.game_map.home_id:
+            background = QColor('green')
+            text_color = QColor('white')
+        # 已探索区域
+        elif area['explored']:
+            background = QColor('#eee')
+        else:
+            background = None
+
+        if background is not None:
+            painter.fillRect(rect, background)
+        painter.setPen(border)
+        painter.drawRect(rect.adjusted(0, 0, -1, -1))
+        painter.setPen(text_color)
+        painter.drawText(rect, Qt.AlignCenter, f"{area['type'][0]}\n{area_id}")
+
+
+class MiniMapWidget(QWidget):
+    """小地图：整个世界每个区域对应图像中的 1 个像素，缩放后显示，并标出玩家和视野范围"""
+
+    UNEXPLORED = QColor('#555')
+    EXPLORED = QColor('#ddd')
+    HOME = QColor('green')
+
+    def __init__(self, game_map, player, map_widget=None, parent=None):
+        super().__init__(parent)
+        self.game_map = game_map
+        self.player = player
+        self.map_widget = map_widget
+        self.setFixedSize(MINIMAP_SIZE, MINIMAP_SIZE)
+        self.image = None
+        self._rebuild()
+
+    def _rebuild(self):
+        """按当前地图完整生成小地图图像（只在创建时扫描一次）"""
+        size = self.game_map.map_size
+        self.image = QImage(size, size, QImage.Format_RGB32)
+        self.image.fill(self.UNEXPLORED)
+        for area in self.game_map.iter_areas():
+            if area['explored']:
+                self.mark_explored(area['x'], area['y'])
+
+    def _pixel(self, x, y):
+        radius = (self.image.width() - 1) // 2
+        return x + radius, y + radius
+
+    def mark_explored(self, x, y):
+        """把一个区域标记为已探索（只改一个像素）"""
+        color = self.HOME if (x, y) == (self.game_map.home_x, self.game_map.home_y) else self.EXPLORED
+        self.image.setPixelColor(*self._pixel(x, y), color)
+        self.update()
+
+    def refresh(self):
+        """地图扩展后把旧图像平移到新图像中央，新增的外圈都是未探索区域"""
+        size = self.game_map.map_size
+        if self.image.width() != size:
+            offset = (size - self.image.width()) // 2
+            image = QImage(size, size, QImage.Format_RGB32)
+            image.fill(self.UNEXPLORED)
+            painter = QPainter(image)
+            painter.drawImage(QPoint(offset, offset), self.image)
+            painter.end()
+            self.image = image
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.palette().window())
+        painter.drawImage(self.rect(), self.image)
+
+        # 玩家位置与视野范围
+        scale = self.width() / self.image.width()
+        px, py = self._pixel(self.player.locationX, self.player.locationY)
+        marker = max(2, int(scale))
+        painter.fillRect(int(px * scale), int(py * scale), marker, marker, QColor('red'))
+        if self.map_widget is not None and self.map_widget.viewport:
+            radius = self.map_widget.viewport_radius
+            painter.setPen(QPen(QColor('yellow'), 1))
+            painter.drawRect(int((px - radius) * scale), int((py - radius) * scale),
+                             int((2 * radius + 1) * scale), int((2 * radius + 1) * scale))
+        painter.end()
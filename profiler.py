@@ -0,0 +1,111 @@
+"""操作耗时统计：记录每个界面处理函数和引擎操作的耗时，按最近的样本计算 p50/p95/p99
+
+默认不启用。启用后（python main.py --profile）由 GameWindow 用 instrument() 把处理函数替换为计时版本，
+退出时把统计写入 JSON 文件；界面中按 F12 显示/隐藏统计浮层。
+每项的耗时包含其中调用的其他项（如 move_player 包含 session.move 和 append_text）。
+"""
+import functools
+import json
+import math
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+PROFILE_PATH = os.path.join('logs', 'latency.json')  # 默认的统计输出文件
+WINDOW = 1000  # 每项保留的最近样本数
+
+
+class LatencyStats:
+    """一项操作的耗时：总次数和最近 window 个样本（毫秒）"""
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+
+    def percentile(self, p, ordered=None):
+        """最近样本的第 p 百分位数（最近秩法）"""
+        ordered = sorted(self.samples) if ordered is None else ordered
+        if not ordered:
+            return 0.0
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        return {
+            'count': self.count,
+            'mean': sum(ordered) / len(ordered) if ordered else 0.0,
+            'p50': self.percentile(50, ordered),
+            'p95': self.percentile(95, ordered),
+            'p99': self.percentile(99, ordered),
+            'max': ordered[-1] if ordered else 0.0,
+        }
+
+
+class ActionProfiler:
+    """按名字统计耗时
+
+    profiler.wrap(name, func) 返回计时版本的函数；with profiler.timed(name): 统计一段代码；
+    instrument(obj, names) 把对象上的多个方法替换为计时版本。
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.actions = {}  # {名字: LatencyStats}
+
+    def record(self, name, ms):
+        stats = self.actions.get(name)
+        if stats is None:
+            stats = self.actions[name] = LatencyStats(self.window)
+        stats.add(ms)
+
+    @contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def wrap(self, name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, (time.perf_counter() - start) * 1000)
+        return wrapper
+
+    def instrument(self, obj, names, prefix=''):
+        """把 obj 上的方法替换为计时版本（实例属性，只影响这个对象），统计名为 prefix + 方法名"""
+        for name in names:
+            setattr(obj, name, self.wrap(prefix + name, getattr(obj, name)))
+
+    def stats(self):
+        """{名字: {'count', 'mean', 'p50', 'p95', 'p99', 'max'}}（毫秒），按 p95 从大到小排列"""
+        summaries = {name: stats.summary() for name, stats in self.actions.items()}
+        return dict(sorted(summaries.items(), key=lambda item: -item[1]['p95']))
+
+    def summary_lines(self, limit=None):
+        """统计表的文字版（每行一项）"""
+        lines = [f"{'操作':<24}{'次数':>7}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)"]
+        for name, summary in list(self.stats().items())[:limit]:
+            lines.append(f"{name:<24}{summary['count']:>7}{summary['p50']:>9.2f}"
+                         f"{summary['p95']:>9.2f}{summary['p99']:>9.2f}")
+        return lines
+
+    def dump(self, path=PROFILE_PATH):
+        """把统计写入 JSON 文件"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        data = {'window': self.window,
+                'actions': {name: {key: round(value, 4) if isinstance(value, float) else value
+                                   for key, value in summary.items()}
+                            for name, summary in self.stats().items()}}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
@@ -0,0 +1,40 @@
+from PySide6.QtCore import QTimer
+
+
+class RefreshScheduler:
+    """界面刷新调度：游戏动作只标记哪些部分需要刷新，每轮事件循环结束时统一刷新一次
+
+    handlers 为 {名称: 刷新函数}，按字典顺序执行；标记时附带的对象（如需要重绘的单元格）
+    会去重后作为集合传给对应的刷新函数。supersedes 声明某项刷新已包含其他项，
+    如整张地图重绘时不必再单独重绘单元格。
+    """
+
+    def __init__(self, handlers, supersedes=None):
+        self.handlers = handlers
+        self.supersedes = supersedes or {}
+        self._dirty = {}  # {名称: 附带对象集合}
+        self._scheduled = False
+
+    def mark(self, name, *items):
+        """标记 name 需要刷新"""
+        self._dirty.setdefault(name, set()).update(items)
+        if not self._scheduled:
+            self._scheduled = True
+            QTimer.singleShot(0, self.flush)
+
+    def is_dirty(self, name):
+        return name in self._dirty
+
+    def flush(self):
+        """立即执行所有待刷新的项"""
+        self._scheduled = False
+        dirty, self._dirty = self._dirty, {}
+        for name in list(dirty):
+            for covered in self.supersedes.get(name, ()):
+                dirty.pop(covered, None)
+        for name, handler in self.handlers.items():
+            if name in dirty:
+                if dirty[name]:
+                    handler(dirty[name])
+                else:
+                    handler()
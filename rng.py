@@ -0,0 +1,72 @@
+import hashlib
+import random
+
+try:
+    import numpy as np
+except ImportError:  # 未安装 numpy 时只提供标准库随机数流
+    np = None
+
+# 各子系统使用的随机数流
+WORLD = 'world'  # 地图生成
+EVENTS = 'events'  # 探索事件选择、祝福和诅咒
+COMBAT = 'combat'  # 战斗暴击
+LOOT = 'loot'  # 掉落与奖励
+
+
+def derive_seed(seed, name):
+    """由父种子和名字稳定地派生出 64 位子种子（不依赖 Python 的 hash 随机化）"""
+    digest = hashlib.blake2b(f"{seed}:{name}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class RandomStreams:
+    """按用途划分的独立随机数流
+
+    每个名字对应一个由 (seed, 名字) 派生种子的 random.Random，一个子系统抽取多少次随机数
+    都不会影响其他子系统；同一个种子总能得到同样的结果。未指定种子时随机选择一个并记录在 seed 中，
+    便于事后复现。numpy(name) 返回同一条流对应的 numpy 生成器，供批量抽样使用。
+    """
+
+    def __init__(self, seed=None):
+        self.seed = seed if seed is not None else random.SystemRandom().getrandbits(63)
+        self._streams = {}
+        self._generators = {}
+
+    def seed_for(self, name):
+        """名字为 name 的流使用的种子"""
+        return derive_seed(self.seed, name)
+
+    def stream(self, name):
+        """名字为 name 的 random.Random（同一个名字总是返回同一个对象）"""
+        stream = self._streams.get(name)
+        if stream is None:
+            stream = self._streams[name] = random.Random(self.seed_for(name))
+        return stream
+
+    def numpy(self, name):
+        """名字为 name 的 numpy 随机数生成器，与 stream(name) 同源但状态独立"""
+        generator = self._generators.get(name)
+        if generator is None:
+            generator = self._generators[name] = np.random.default_rng(self.seed_for(name))
+        return generator
+
+    def spawn(self, name):
+        """派生一组新的独立随机数流（如每个模拟任务一组）"""
+        return RandomStreams(self.seed_for(name))
+
+    def getstate(self):
+        """所有已使用的流的当前状态，可用 setstate 恢复"""
+        return {
+            'seed': self.seed,
+            'streams': {name: stream.getstate() for name, stream in self._streams.items()},
+            'generators': {name: generator.bit_generator.state for name, generator in self._generators.items()},
+        }
+
+    def setstate(self, state):
+        self.seed = state['seed']
+        self._streams = {}
+        self._generators = {}
+        for name, stream_state in state['streams'].items():
+            self.stream(name).setstate(stream_state)
+        for name, generator_state in state['generators'].items():
+            self.numpy(name).bit_generator.state = generator_state
@@ -0,0 +1,575 @@
+"""存档：完整存档使用紧凑的二进制格式，之后每个操作只向增量文件追加发生变化的部分
+
+完整存档（path）：
+    MAGIC(8) 存档标识(8) 字段数据长度(varint) 字段数据
+    地图头 MAP_HEADER（尺寸、是否有种子、种子、是否保存类型）
+    增量起点(varint)：增量文件中从这个偏移开始的记录才需要应用
+    已探索的区域编号（explored.ExploredSet 的序列化，连成片的编号只占几个字节）
+    zlib 压缩的区域类型（每个区域 1 字节，按编号排列；地图有种子时类型可由种子重新生成，不保存）
+    CRC32(<I)：之前全部内容的校验值
+字段数据依次是 FIELDS 中每个字段的编码（玩家属性、装备、物品、会话阶段和当前怪物）。
+
+增量文件（path + '.delta'）：DELTA_MAGIC(8) 存档标识(8)，之后每条记录为 记录长度(varint) 记录内容 记录内容的 CRC32(<I)：
+    变化的字段数(varint) [字段序号(varint) 字段编码]...
+    新探索的区域数(varint) [与上一个编号的差(varint)]...
+    新的地图尺寸(varint，0 表示未变化) [新增区域的类型]
+一次移动通常只有几个字节。存档标识与完整存档不一致的增量文件（旧存档留下的）会被忽略，
+末尾不完整或校验不符的记录（写入时程序退出）也会被忽略；校验不符的记录后面还有记录时存档视为损坏。
+
+自动存档：增量记录只写字段的新值，重复应用没有影响，所以后台写完整存档时增量文件不用重新开始，
+完整存档记下快照时增量文件的长度（增量起点）即可。快照在主线程上生成，只复制字段编码和
+地图数据的引用（区域类型只追加，已探索集合写时复制），序列化、压缩和 fsync 都在后台线程完成，不会卡住界面。
+"""
+import copy
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+
+from explored import ExploredSet
+from item import EQUIPMENT_TEMPLATE
+
+MAGIC = b'HNSAVE02'
+DELTA_MAGIC = b'HNDELTA2'
+MAP_HEADER = struct.Struct('<IBQB')  # 地图尺寸, 是否有种子, 种子, 是否保存类型
+STATES = ('explore', 'encounter', 'battle', 'dead')
+EQUIPMENT_NAMES = list(EQUIPMENT_TEMPLATE)
+NO_WEAPON = 0xFF
+_DOUBLE = struct.Struct('<d')
+_CRC = struct.Struct('<I')
+_MONSTER_STATS = ('hp', 'attack', 'defense', 'reward', 'xp')
+AUTOSAVE_INTERVAL = 30.0  # 自动存档间隔（秒）
+
+
+def encode_varint(value):
+    """无符号整数 -> LEB128 变长编码"""
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(data, offset):
+    """返回 (整数, 新的偏移)"""
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+# 字段编码：每种类型是 (编码函数, 解码函数)，解码函数返回 (值, 新的偏移)
+def _encode_int(value):
+    return encode_varint(value * 2 if value >= 0 else -value * 2 - 1)  # zigzag
+
+
+def _decode_int(data, offset):
+    value, offset = decode_varint(data, offset)
+    return (value >> 1) ^ -(value & 1), offset
+
+
+def _encode_str(value):
+    raw = value.encode('utf-8')
+    return encode_varint(len(raw)) + raw
+
+
+def _decode_str(data, offset):
+    length, offset = decode_varint(data, offset)
+    return bytes(data[offset:offset + length]).decode('utf-8'), offset + length
+
+
+def _encode_items(items):
+    out = bytearray(encode_varint(len(items)))
+    for name, count in items.items():
+        out += _encode_str(name) + _encode_int(count)
+    return bytes(out)
+
+
+def _decode_items(data, offset):
+    count, offset = decode_varint(data, offset)
+    items = {}
+    for _ in range(count):
+        name, offset = _decode_str(data, offset)
+        items[name], offset = _decode_int(data, offset)
+    return items, offset
+
+
+def _encode_monster(monster):
+    if monster is None:
+        return b'\x00'
+    return b'\x01' + _encode_str(monster['name']) + b''.join(_encode_int(monster[key]) for key in _MONSTER_STATS)
+
+
+def _decode_monster(data, offset):
+    offset += 1
+    if data[offset - 1] == 0:
+        return None, offset
+    monster = {}
+    monster['name'], offset = _decode_str(data, offset)
+    for key in _MONSTER_STATS:
+        monster[key], offset = _decode_int(data, offset)
+    return monster, offset
+
+
+def _encode_armors(armors):
+    return encode_varint(len(armors)) + bytes(EQUIPMENT_NAMES.index(name) for name in armors)
+
+
+def _decode_armors(data, offset):
+    count, offset = decode_varint(data, offset)
+    return [EQUIPMENT_NAMES[index] for index in data[offset:offset + count]], offset + count
+
+
+INT = (_encode_int, _decode_int)
+STR = (_encode_str, _decode_str)
+FLOAT = (_DOUBLE.pack, lambda data, offset: (_DOUBLE.unpack_from(data, offset)[0], offset + _DOUBLE.size))
+ITEMS = (_encode_items, _decode_items)
+MONSTER = (_encode_monster, _decode_monster)
+ARMORS = (_encode_armors, _decode_armors)  # 保持装备顺序
+
+
+def _player_attr(name):
+    return (lambda session: getattr(session.player, name),
+            lambda session, value: setattr(session.player, name, value))
+
+
+def _curse(key):
+    return (lambda session: session.player.curses[key],
+            lambda session, value: session.player.curses.__setitem__(key, value))
+
+
+def _set_obtained(session, mask):
+    for index, name in enumerate(EQUIPMENT_NAMES):
+        session.player.equipment[name]['obtained'] = bool(mask >> index & 1)
+
+
+def _set_state(session, code):
+    session.state = STATES[code]
+
+
+def _set_monster(session, monster):
+    session.monster = monster
+
+
+def _set_weapon(session, index):
+    session.player.equipped_weapon = None if index == NO_WEAPON else EQUIPMENT_NAMES[index]
+
+
+# 存档字段：(名字, 读取函数, 写入函数, 编码)，增量记录中用序号指代字段，只能在末尾追加新字段
+FIELDS = [
+    ('name',) + _player_attr('name') + STR,
+    ('hp',) + _player_attr('hp') + INT,
+    ('maxhp',) + _player_attr('maxhp') + INT,
+    ('base_maxhp',) + _player_attr('base_maxhp') + INT,
+    ('gold',) + _player_attr('gold') + INT,
+    ('items',) + _player_attr('items') + ITEMS,
+    ('obtained', lambda session: sum(1 << index for index, name in enumerate(EQUIPMENT_NAMES)
+                                     if session.player.equipment[name]['obtained']), _set_obtained) + INT,
+    ('equipped_armors',) + _player_attr('equipped_armors') + ARMORS,
+    ('equipped_weapon', lambda session: EQUIPMENT_NAMES.index(session.player.equipped_weapon)
+     if session.player.equipped_weapon else NO_WEAPON, _set_weapon) + INT,
+    ('level',) + _player_attr('level') + INT,
+    ('xp',) + _player_attr('xp') + INT,
+    ('xpForNextLevel',) + _player_attr('xpForNextLevel') + INT,
+    ('locationX',) + _player_attr('locationX') + INT,
+    ('locationY',) + _player_attr('locationY') + INT,
+    ('locationID',) + _player_attr('locationID') + INT,
+    ('exploredAreas',) + _player_attr('exploredAreas') + INT,
+    ('home_locationID',) + _player_attr('home_locationID') + INT,
+    ('strength',) + _player_attr('strength') + INT,
+    ('agility',) + _player_attr('agility') + INT,
+    ('vitality',) + _player_attr('vitality') + INT,
+    ('luck',) + _player_attr('luck') + INT,
+    ('attack',) + _player_attr('attack') + INT,
+    ('defense',) + _player_attr('defense') + INT,
+    ('critical_chance',) + _player_attr('critical_chance') + INT,
+    ('attack_bonus',) + _player_attr('attack_bonus') + INT,
+    ('gold_bonus',) + _player_attr('gold_bonus') + INT,
+    ('maxhp_penalty',) + _curse('maxhp_penalty') + INT,
+    ('attack_penalty',) + _curse('attack_penalty') + INT,
+    ('cursed_prob',) + _curse('cursed_prob') + FLOAT,
+    ('still_alive', lambda session: int(session.player.still_alive),
+     lambda session, value: setattr(session.player, 'still_alive', bool(value))) + INT,
+    ('state', lambda session: STATES.index(session.state), _set_state) + INT,
+    ('monster', lambda session: session.monster, _set_monster) + MONSTER,
+]
+
+
+def encode_fields(session):
+    """每个字段的编码（列表，与 FIELDS 一一对应）"""
+    return [encode(read(session)) for _, read, _, encode, _ in FIELDS]
+
+
+def _apply_fields(session, values):
+    for index, value in values.items():
+        FIELDS[index][2](session, value)
+
+
+def _write_file(path, data):
+    """先写临时文件并 fsync 再替换，写入中途退出不会损坏原文件"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)  # 让替换本身也落盘
+        finally:
+            os.close(fd)
+
+
+def serialize_snapshot(snapshot):
+    """快照 -> 完整存档的字节（压缩地图数据，可以在后台线程中调用）"""
+    explored = snapshot['explored'].serialize()
+    data = b''.join((MAGIC, snapshot['token'], encode_varint(len(snapshot['fields'])), snapshot['fields'],
+                     snapshot['map_header'], encode_varint(snapshot['delta_offset']),
+                     encode_varint(len(explored)), explored, zlib.compress(b''.join(snapshot['types']))))
+    return data + _CRC.pack(zlib.crc32(data))
+
+
+class AutosaveWorker(threading.Thread):
+    """后台写完整存档的线程
+
+    队列只容纳一个快照：磁盘太慢、上一个快照还没写完时，新快照替换掉还在排队的旧快照（计入 dropped）。
+    """
+
+    def __init__(self, path, stats):
+        super().__init__(name='autosave', daemon=True)
+        self.path = path
+        self.stats = stats
+        self.queue = queue.Queue(maxsize=1)
+
+    def submit(self, snapshot):
+        while True:
+            try:
+                self.queue.put_nowait(snapshot)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.stats['dropped'] += 1
+                except queue.Empty:
+                    pass
+
+    def stop(self):
+        """丢弃还在排队的快照，等正在写的存档写完后结束线程"""
+        try:
+            self.queue.get_nowait()
+            self.stats['dropped'] += 1
+        except queue.Empty:
+            pass
+        self.queue.put(None)
+        self.join()
+
+    def run(self):
+        while True:
+            snapshot = self.queue.get()
+            if snapshot is None:
+                return
+            start = time.perf_counter()
+            try:
+                data = serialize_snapshot(snapshot)
+                _write_file(self.path, data)
+            except OSError as error:
+                self.stats['errors'] += 1
+                self.stats['last_error'] = str(error)
+                continue
+            self.stats['write_ms'].append((time.perf_counter() - start) * 1000)
+            self.stats['written'] += 1
+            self.stats['bytes'] = len(data)
+
+
+class SaveGame:
+    """把会话完整保存到 path，之后每个操作只向 path + '.delta' 追加变化的部分
+
+    attach() 后每个成功的操作都会自动追加一条增量记录，并且每隔 autosave_interval 秒在后台线程中
+    写一份新的完整存档（autosave_interval 为 None 时不自动存档）；save() 在当前线程写完整存档并清空增量文件。
+    """
+
+    def __init__(self, session, path, autosave_interval=AUTOSAVE_INTERVAL):
+        self.session = session
+        self.path = path
+        self.delta_path = path + '.delta'
+        self.delta_file = None
+        self.delta_bytes = 0  # 当前增量文件的大小
+        self.autosave_interval = autosave_interval
+        self.worker = None
+        self.stats = {'snapshots': 0, 'written': 0, 'dropped': 0, 'errors': 0, 'bytes': 0,
+                      'snapshot_ms': deque(maxlen=256), 'write_ms': deque(maxlen=256)}
+        self._token = None
+        self._fields = None  # 上次写入时各字段的编码
+        self._map_size = None
+        self._store_types = session.game_map.seed is None
+        self._type_chunks = []  # 区域类型只会追加，按地图扩展分块保存，快照直接引用
+        self._last_autosave = time.monotonic()
+
+    def attach(self):
+        """每个操作之后自动追加增量记录（还没有完整存档时先保存一次）"""
+        if self._fields is None:
+            self.save()
+        self.session.action_listeners.append(self.on_action)
+
+    def on_action(self, action, args):
+        self.append_delta()
+        if self.autosave_interval is not None and time.monotonic() - self._last_autosave >= self.autosave_interval:
+            self.autosave()
+
+    def snapshot(self):
+        """当前状态的快照（需要先 append_delta，让快照与增量文件的当前长度对应）
+
+        只复制字段编码和引用，之后修改地图不会影响快照，快照可以交给其他线程序列化。
+        """
+        game_map = self.session.game_map
+        return {
+            'token': self._token,
+            'fields': b''.join(self._fields),
+            'map_header': MAP_HEADER.pack(game_map.map_size, game_map.seed is not None,
+                                          game_map.seed or 0, self._store_types),
+            'delta_offset': self.delta_bytes,
+            'types': tuple(self._type_chunks),
+            'explored': game_map.export_explored(),
+        }
+
+    def autosave(self):
+        """在主线程生成快照，交给后台线程写完整存档"""
+        start = time.perf_counter()
+        snapshot = self.snapshot()
+        self.stats['snapshot_ms'].append((time.perf_counter() - start) * 1000)
+        self.stats['snapshots'] += 1
+        self._last_autosave = time.monotonic()
+        if self.worker is None:
+            self.worker = AutosaveWorker(self.path, self.stats)
+            self.worker.start()
+        self.worker.submit(snapshot)
+
+    def autosave_stats(self):
+        """自动存档统计：快照数、写入数、丢弃数、出错数、最近一次的存档大小，
+        以及快照（主线程）和写入（后台线程）耗时的平均值和最大值（毫秒）"""
+        result = {key: self.stats[key] for key in ('snapshots', 'written', 'dropped', 'errors', 'bytes')}
+        for key in ('snapshot_ms', 'write_ms'):
+            samples = list(self.stats[key])
+            result[key] = {'mean': sum(samples) / len(samples) if samples else 0.0,
+                           'max': max(samples, default=0.0)}
+        return result
+
+    def _stop_worker(self):
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+
+    def save(self):
+        """在当前线程写入完整存档，并开始新的增量文件"""
+        self._stop_worker()  # 不能与后台线程同时写存档
+        game_map = self.session.game_map
+        game_map.explored_log = []
+        self._token = os.urandom(8)
+        self._fields = encode_fields(self.session)
+        self._map_size = game_map.map_size
+        self._type_chunks = [game_map.export_types()] if self._store_types else []
+        if self.delta_file is not None:
+            self.delta_file.close()
+            self.delta_file = None
+        self.delta_bytes = len(DELTA_MAGIC) + len(self._token)
+
+        data = serialize_snapshot(self.snapshot())
+        _write_file(self.path, data)
+        self.delta_file = open(self.delta_path, 'wb')
+        self.delta_file.write(DELTA_MAGIC + self._token)
+        self.delta_file.flush()
+        self._last_autosave = time.monotonic()
+        return len(data)
+
+    def append_delta(self):
+        """把上次写入之后的变化追加到增量文件，返回写入的字节数（没有变化时不写入）"""
+        game_map = self.session.game_map
+        fields = encode_fields(self.session)
+        changed = [index for index, (old, new) in enumerate(zip(self._fields, fields)) if old != new]
+        explored = sorted(game_map.explored_log)
+        game_map.explored_log.clear()
+        grown = game_map.map_size != self._map_size
+        if not (changed or explored or grown):
+            return 0
+
+        body = bytearray(encode_varint(len(changed)))
+        for index in changed:
+            body += encode_varint(index) + fields[index]
+        body += encode_varint(len(explored))
+        previous = 0
+        for area_id in explored:
+            body += encode_varint(area_id - previous)
+            previous = area_id
+        if grown:
+            body += encode_varint(game_map.map_size)
+            if self._store_types:
+                new_types = game_map.export_types(self._map_size ** 2 + 1, game_map.map_num)
+                self._type_chunks.append(new_types)
+                body += new_types
+        else:
+            body += encode_varint(0)
+
+        record = encode_varint(len(body)) + body + _CRC.pack(zlib.crc32(body))
+        self.delta_file.write(record)
+        self.delta_file.flush()
+        self.delta_bytes += len(record)
+        self._fields = fields
+        self._map_size = game_map.map_size
+        return len(record)
+
+    def discard(self):
+        """删除存档和增量文件（如游戏结束后）"""
+        self._detach()
+        for path in (self.path, self.delta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        """正常退出：把增量合并成新的完整存档（增量文件重新开始），然后关闭文件"""
+        attached = self.on_action in self.session.action_listeners
+        self._detach()
+        if attached:
+            self.save()
+            self.delta_file.close()
+            self.delta_file = None
+
+    def _detach(self):
+        self._stop_worker()
+        if self.on_action in self.session.action_listeners:
+            self.session.action_listeners.remove(self.on_action)
+        if self.delta_file is not None:
+            self.delta_file.close()
+            self.delta_file = None
+
+
+def read_save(path):
+    """读取完整存档和增量文件，返回合并后的内容：
+    {'fields': {字段序号: 值}, 'map_size', 'seed', 'types'（无种子时）, 'explored': 已探索编号（ExploredSet）, 'deltas': 增量记录数}
+    文件不是存档或已损坏时抛出 ValueError。
+    """
+    try:
+        return _read_save(path)
+    except (IndexError, KeyError, OverflowError, struct.error, zlib.error, UnicodeDecodeError) as error:
+        raise ValueError(f"{path} 存档已损坏：{error!r}") from error
+
+
+def _read_save(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} 不是存档文件")
+    data, checksum = memoryview(data)[:-_CRC.size], data[-_CRC.size:]
+    if len(checksum) < _CRC.size or zlib.crc32(data) != _CRC.unpack(checksum)[0]:
+        raise ValueError(f"{path} 存档已损坏：校验不符")
+    offset = len(MAGIC)
+    token = bytes(data[offset:offset + 8])
+    offset += 8
+    length, offset = decode_varint(data, offset)
+    end = offset + length
+    fields = {}
+    for index, (_, _, _, _, decode) in enumerate(FIELDS):
+        fields[index], offset = decode(data, offset)
+    if offset != end:
+        raise ValueError(f"{path} 存档已损坏：字段长度不符")
+
+    map_size, has_seed, seed, has_types = MAP_HEADER.unpack_from(data, offset)
+    offset += MAP_HEADER.size
+    _check_map_size(path, map_size)
+    if not (has_seed or has_types):
+        raise ValueError(f"{path} 存档已损坏：没有种子也没有区域类型")
+    delta_offset, offset = decode_varint(data, offset)
+    length, offset = decode_varint(data, offset)
+    explored, explored_end = ExploredSet.deserialize(data[:offset + length], offset)
+    if explored_end != offset + length:
+        raise ValueError(f"{path} 存档已损坏：已探索区域长度不符")
+    types = None
+    if has_types:
+        types = bytearray(zlib.decompress(data[offset + length:]))
+
+    deltas = 0
+    delta_path = path + '.delta'
+    if os.path.exists(delta_path):
+        with open(delta_path, 'rb') as f:
+            delta = f.read()
+        if delta[:len(DELTA_MAGIC)] == DELTA_MAGIC and delta[len(DELTA_MAGIC):len(DELTA_MAGIC) + 8] == token:
+            offset = delta_offset  # 之前的记录已经包含在完整存档里
+            while offset < len(delta):
+                try:
+                    length, body_start = decode_varint(delta, offset)
+                except IndexError:
+                    break
+                body_end = body_start + length
+                if body_end + _CRC.size > len(delta):
+                    break  # 写入时中断的不完整记录
+                if zlib.crc32(delta[body_start:body_end]) != _CRC.unpack_from(delta, body_end)[0]:
+                    if body_end + _CRC.size == len(delta):
+                        break  # 最后一条记录没有写完整
+                    raise ValueError(f"{delta_path} 增量记录已损坏：校验不符")
+                body = memoryview(delta)[:body_end]
+                offset = body_start
+                count, offset = decode_varint(body, offset)
+                for _ in range(count):
+                    index, offset = decode_varint(body, offset)
+                    fields[index], offset = FIELDS[index][4](body, offset)
+                count, offset = decode_varint(body, offset)
+                area_id = 0
+                for _ in range(count):
+                    step, offset = decode_varint(body, offset)
+                    area_id += step
+                    explored.add(area_id)
+                new_size, offset = decode_varint(body, offset)
+                if new_size:
+                    _check_map_size(delta_path, new_size, map_size)
+                    if has_types:
+                        added = new_size * new_size - map_size * map_size
+                        types += body[offset:offset + added]
+                        offset += added
+                    map_size = new_size
+                if offset != body_end:
+                    raise ValueError(f"{delta_path} 增量记录已损坏：长度不符")
+                offset += _CRC.size
+                deltas += 1
+
+    if types is not None and len(types) != map_size * map_size:
+        raise ValueError(f"{path} 存档已损坏：区域类型数 {len(types)} 与地图尺寸 {map_size} 不符")
+    if explored.count(1, map_size * map_size) != len(explored):
+        raise ValueError(f"{path} 存档已损坏：已探索的区域编号超出地图")
+    return {'fields': fields, 'map_size': map_size, 'seed': seed if has_seed else None,
+            'types': bytes(types) if types is not None else None, 'explored': explored, 'deltas': deltas}
+
+
+def _check_map_size(path, map_size, previous=0):
+    """地图尺寸必须是正奇数，扩展后只会变大"""
+    if map_size % 2 == 0 or map_size <= previous:
+        raise ValueError(f"{path} 存档已损坏：地图尺寸 {map_size} 无效")
+
+
+def load_game(path, prefetch=False, **map_options):
+    """从存档（含增量文件）恢复一个 GameSession；prefetch 传给 GameSession，map_options 传给 GameMap（如 compact=True）"""
+    from engine import GameSession
+    from map import GameMap
+    from player import Player
+
+    save = read_save(path)
+    player = Player()
+    player.init_equipment(copy.deepcopy(EQUIPMENT_TEMPLATE))
+    game_map = GameMap(map_size=save['map_size'], seed=save['seed'], **map_options)
+    game_map.restore(player, save['explored'], save['types'])
+    session = GameSession(player, game_map, prefetch=prefetch)
+    try:
+        _apply_fields(session, save['fields'])
+    except (IndexError, KeyError, TypeError) as error:
+        raise ValueError(f"{path} 存档已损坏：{error!r}") from error
+    session.started = True
+    return session
@@ -0,0 +1,194 @@
+"""终端版前端：直接在命令行里游玩，不导入 PySide6，没有显示器的机器上也能运行"""
+from engine import GameSession, RESURRECT_COST
+from item import SHOP_ITEMS
+from battlesim import describe_prediction
+
+MOVE_KEYS = {'w': 'up', 's': 'down', 'a': 'left', 'd': 'right'}
+MAP_RADIUS = 3  # 地图命令显示玩家周围的格数
+
+HELP = """命令：
+  w/a/s/d 移动    x 探索    r 休息（老家）   i 查看物品
+  u 物品名 使用物品    shop 查看商店    b 商品名 购买（老家）
+  e 查看装备    e 装备名 装备/卸下    st 角色状态    m 地图
+  h 帮助    q 退出
+战斗中：a 攻击    u 喝胡辣汤    f 逃跑    o 自动战斗（生命值低时自动喝胡辣汤）"""
+
+
+class TerminalUI:
+    """基于 input()/print() 的文字界面，所有游戏逻辑都交给 GameSession"""
+
+    def __init__(self, session, input_func=input, output_func=print):
+        self.session = session
+        self.input = input_func
+        self.output = output_func
+
+    def show(self, result):
+        for msg in result['messages']:
+            self.output(msg)
+
+    def prompt(self, text):
+        """读取一行输入，输入结束（EOF）时返回 None"""
+        try:
+            return self.input(text).strip()
+        except EOFError:
+            return None
+
+    def run(self):
+        self.output("欢迎来到《河南冒险记》（终端版）！")
+        if self.session.started:
+            self.output(f"已读取存档，欢迎回来，{self.session.player.name}！")
+        else:
+            self.output("特殊说明：输入名字「WEP」可激活管理员模式，直接获得所有装备！")
+            while True:
+                name = self.prompt("请输入你的名字: ")
+                if name is None:
+                    return
+                result = self.session.start(name)
+                if result['ok']:
+                    break
+            self.show(result)
+        self.show(self.session.describe())
+        self.session.start_prefetch()
+        self.output(HELP)
+
+        while True:
+            if self.session.state == 'dead' and not self.handle_death():
+                return
+            if self.session.state == 'encounter':
+                self.encounter(self.session.monster, self.session.predict())
+                continue
+            if self.session.state == 'battle':
+                line = self.prompt("[战斗] a 攻击 / u 胡辣汤 / f 逃跑 / o 自动 > ")
+                if line is None or not self.battle_command(line):
+                    return
+                continue
+            line = self.prompt("> ")
+            if line is None or not self.command(line):
+                return
+
+    def command(self, line):
+        """执行一条探索阶段的命令，返回 False 表示退出游戏"""
+        cmd, _, arg = line.partition(' ')
+        cmd, arg = cmd.lower(), arg.strip()
+        session = self.session
+        if cmd == 'q':
+            return False
+        if cmd in MOVE_KEYS:
+            result = session.move(MOVE_KEYS[cmd])
+            self.show(result)
+            if result['ok']:
+                self.show(session.describe())
+        elif cmd == 'x':
+            self.explore()
+        elif cmd == 'r':
+            self.show(session.rest())
+        elif cmd == 'i':
+            self.show(session.items())
+        elif cmd == 'u':
+            self.show(session.use_item(arg) if arg else session.items())
+        elif cmd == 'shop':
+            self.show_shop()
+        elif cmd == 'b':
+            self.show(session.buy(arg))
+        elif cmd == 'e':
+            if arg:
+                self.show(session.toggle_equipment(arg))
+            else:
+                self.show_equipment()
+        elif cmd == 'st':
+            self.show(session.status())
+        elif cmd == 'm':
+            self.show_map()
+        elif cmd in ('h', 'help', '?'):
+            self.output(HELP)
+        elif cmd:
+            self.output("未知命令，输入 h 查看帮助")
+        return True
+
+    def explore(self):
+        result = self.session.explore()
+        if result.get('monster') is not None:
+            self.encounter(result['monster'], result['prediction'])
+        self.show(result)
+
+    def encounter(self, monster, prediction):
+        """遇到怪物时询问战斗还是逃跑"""
+        self.output(f"你遇到了 {monster['name']}！{describe_prediction(prediction)}")
+        answer = self.prompt(f"是否战斗？(y/n，选择 n 将逃跑并损失5点生命值) ")
+        if answer is not None and answer.lower() in ('', 'y'):
+            self.show(self.session.fight())
+        else:
+            self.show(self.session.flee())
+
+    def battle_command(self, line):
+        cmd = line.lower()
+        if cmd == 'a':
+            self.show(self.session.attack())
+        elif cmd == 'u':
+            self.show(self.session.use_battle_item())
+        elif cmd == 'f':
+            self.show(self.session.flee())
+        elif cmd == 'o':
+            self.show(self.session.auto_battle())
+        elif cmd == 'q':
+            return False
+        return True
+
+    def handle_death(self):
+        """倒下后询问是否复活，返回 False 表示游戏结束"""
+        self.output("你被打败了...")
+        if self.session.can_resurrect():
+            answer = self.prompt(f"你拥有足够的井盖，是否花费{RESURRECT_COST}个井盖复活？(y/n) ")
+            if answer is not None and answer.lower() == 'y':
+                self.show(self.session.resurrect())
+                return True
+        self.output("游戏结束。")
+        return False
+
+    def show_shop(self):
+        self.output("欢迎来到老家井盖商店！（b 商品名 购买）")
+        for item_name, item_info in SHOP_ITEMS.items():
+            owned = item_info['type'] == 'equipment' and self.session.player.equipment[item_name]['obtained']
+            self.output(f"  {item_name} - {item_info['price']}个井盖 | {item_info['desc']}{'（已购买）' if owned else ''}")
+        self.output(f"当前井盖数量: {self.session.player.gold}个")
+
+    def show_equipment(self):
+        player = self.session.player
+        obtained = [(name, info) for name, info in player.equipment.items() if info['obtained']]
+        if not obtained:
+            self.output("你还没有任何装备")
+            return
+        for name, info in obtained:
+            equipped = name in player.equipped_armors or name == player.equipped_weapon
+            eq_type = "【甲胄】" if info['type'] == 'armor' else "【武器】"
+            self.output(f"  {eq_type} {name} | 血量+{info['hp']} | 攻击+{info['attack']}{'（已装备）' if equipped else ''}")
+
+    def show_map(self):
+        """以文字显示玩家周围的区域：@ 玩家，H 老家，已探索区域显示类型首字，? 未探索"""
+        game_map = self.session.game_map
+        player = self.session.player
+        lines = []
+        for y in range(player.locationY - MAP_RADIUS, player.locationY + MAP_RADIUS + 1):
+            row = []
+            for x in range(player.locationX - MAP_RADIUS, player.locationX + MAP_RADIUS + 1):
+                area = game_map.get_area_at(x, y)
+                if area is None:
+                    row.append('  ')
+                elif (x, y) == (player.locationX, player.locationY):
+                    row.append('@ ')
+                elif area['mapID'] == game_map.home_id:
+                    row.append('H ')
+                elif area['explored']:
+                    row.append(area['type'][0])
+                else:
+                    row.append('? ')
+            lines.append(''.join(row))
+        self.output('\n'.join(lines))
+
+
+def main(session=None):
+    TerminalUI(session if session is not None else GameSession(prefetch=True)).run()
+
+
+if __name__ == "__main__":
+    main()